@@ -1,11 +1,207 @@
+import json
+
 from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Substr
+from django.http import StreamingHttpResponse
 
+from . import publishing
+from .counts import invalidate_all
+from .deletion import delete_posts, delete_user, deletion_summary
+from .export import get_columns, iter_rows
 from .models import Category
 from .models import Location
 from .models import Post
 from .models import Comment
+from .models import VersionedModel
+from .models import visibility_condition
+from .paginators import EstimatedCountPaginator
+
+User = get_user_model()
+
+# Столько символов текста комментария показывается в списке.
+PREVIEW_LENGTH = 80
+
+
+@admin.action(description='Выгрузить выбранные в JSONL')
+def export_jsonl(modeladmin, request, queryset):
+    """Отдаёт выбранные строки потоком, не загружая их в память целиком."""
+    columns = get_columns(queryset.model)
+    rows = (
+        json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n'
+        for row in iter_rows(queryset, columns)
+    )
+    response = StreamingHttpResponse(
+        rows, content_type='application/x-ndjson; charset=utf-8')
+    filename = f'{queryset.model._meta.model_name}.jsonl'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def set_published(modeladmin, request, queryset, is_published):
+    """Меняет флаг публикации одним UPDATE, без загрузки объектов."""
+    if queryset.model in (Category, Location):
+        updated, job_id = publishing.set_published(
+            queryset.model, list(queryset.values_list('pk', flat=True)),
+            is_published)
+        message = f'Изменено записей: {updated}.'
+        if job_id is not None:
+            message += ' Видимость постов пересчитывается в фоне.'
+        modeladmin.message_user(request, message)
+        return
+    values = {'is_published': is_published}
+    if issubclass(queryset.model, VersionedModel):
+        # Открытые формы редактирования должны увидеть эту правку.
+        values['version'] = F('version') + 1
+    if queryset.model is Post:
+        values['is_visible'] = Case(
+            When(visibility_condition(check_published=False),
+                 then=Value(is_published)),
+            default=Value(False))
+    updated = queryset.order_by().update(**values)
+    # update() не отправляет post_save, кеши сбрасываем сами.
+    if queryset.model is Post:
+        invalidate_all()
+    modeladmin.message_user(request, f'Изменено записей: {updated}.')
+
+
+@admin.action(description='Опубликовать выбранные')
+def publish(modeladmin, request, queryset):
+    set_published(modeladmin, request, queryset, True)
+
+
+@admin.action(description='Снять с публикации выбранные')
+def unpublish(modeladmin, request, queryset):
+    set_published(modeladmin, request, queryset, False)
+
+
+def is_changelist(request):
+    match = request.resolver_match
+    return match is not None and match.url_name.endswith('_changelist')
+
+
+class ExportAdmin(admin.ModelAdmin):
+    actions = (export_jsonl,)
+    # Точный COUNT(*) по всей таблице не нужен ни в списке, ни в поиске.
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+
+class FastDeleteMixin:
+    """Удаление пачками через blog.deletion вместо сборщика Django.
+
+    Подклассы задают ``summarize_deletion(objs)``. Страница подтверждения
+    показывает только выбранные объекты и число зависимых строк, не
+    загружая их.
+    """
+
+    def get_deleted_objects(self, objs, request):
+        model_count = self.summarize_deletion(objs)
+        perms_needed = {
+            model._meta.verbose_name
+            for model in (Post, Comment)
+            if not request.user.has_perm(
+                f'{model._meta.app_label}.delete_{model._meta.model_name}')
+        }
+        return [str(obj) for obj in objs], model_count, perms_needed, []
+
+
+class PublishableAdmin(ExportAdmin):
+    actions = (publish, unpublish, export_jsonl)
+    list_filter = ('is_published',)
+
+
+@admin.register(Category)
+class CategoryAdmin(PublishableAdmin):
+    list_display = ('title', 'slug', 'is_published', 'propagation',
+                    'created_at')
+    search_fields = ('title', 'slug')
+    prepopulated_fields = {'slug': ('title',)}
+
+    @admin.display(description='Пересчёт постов')
+    def propagation(self, category):
+        entry = publishing.get_category_progress([category.pk]).get(
+            category.pk)
+        if entry is None:
+            return '—'
+        return f'{entry["done"]} из {entry["total"]}'
+
+
+@admin.register(Location)
+class LocationAdmin(PublishableAdmin):
+    list_display = ('name', 'is_published', 'created_at')
+    search_fields = ('name',)
+
+
+@admin.register(Post)
+class PostAdmin(FastDeleteMixin, PublishableAdmin):
+    list_display = ('title', 'author', 'category', 'location', 'pub_date',
+                    'is_published')
+    list_select_related = ('author', 'category', 'location')
+    list_filter = ('is_published', 'category')
+    # Поиск только по началу заголовка, чтобы мог работать индекс.
+    search_fields = ('^title',)
+    date_hierarchy = 'pub_date'
+    ordering = ('-pub_date',)
+    raw_id_fields = ('author',)
+    autocomplete_fields = ('category', 'location')
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if is_changelist(request):
+            # Текст поста в списке не показывается.
+            queryset = queryset.defer('text')
+        return queryset
+
+    def summarize_deletion(self, objs):
+        return deletion_summary(
+            posts=Post.objects.filter(pk__in=[obj.pk for obj in objs]))
+
+    def delete_model(self, request, obj):
+        delete_posts(Post.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        delete_posts(queryset)
+
+
+@admin.register(Comment)
+class CommentAdmin(ExportAdmin):
+    list_display = ('preview', 'post', 'author', 'created_at')
+    list_select_related = ('post', 'author')
+    raw_id_fields = ('post', 'author')
+    ordering = ('-created_at', '-id')
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if is_changelist(request):
+            queryset = queryset.defer(
+                'text', 'post__text'
+            ).annotate(text_preview=Substr('text', 1, PREVIEW_LENGTH))
+        return queryset
+
+    @admin.display(description='Текст')
+    def preview(self, comment):
+        return getattr(comment, 'text_preview', None) or comment.text
+
+
+admin.site.unregister(User)
+
+
+@admin.register(User)
+class BlogUserAdmin(FastDeleteMixin, UserAdmin):
+    def summarize_deletion(self, objs):
+        model_count = {}
+        for user in objs:
+            for name, count in deletion_summary(user=user).items():
+                model_count[name] = model_count.get(name, 0) + count
+        return model_count
+
+    def delete_model(self, request, obj):
+        delete_user(obj)
 
-admin.site.register(Category)
-admin.site.register(Location)
-admin.site.register(Post)
-admin.site.register(Comment)
+    def delete_queryset(self, request, queryset):
+        for user in queryset:
+            delete_user(user)
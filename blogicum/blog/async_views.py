@@ -0,0 +1,188 @@
+"""Асинхронные (ASGI) версии «читающих» страниц блога.
+
+ORM Django 3.2 синхронный, поэтому каждый независимый запрос выполняется
+в отдельном потоке через ``sync_to_async(thread_sensitive=False)``,
+а запросы одной страницы запускаются одновременно через ``asyncio.gather``.
+Шаблон рендерится в синхронном потоке и не блокирует цикл событий.
+"""
+import asyncio
+import functools
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.paginator import Page
+from django.db import close_old_connections
+from django.http import Http404
+from django.shortcuts import redirect, render
+
+from .forms import CommentForm
+from .counts import CountedPaginator, category_scope, feed_scope, get_count
+from .loaders import get_loaders, load_related
+from .reference import get_category_by_slug
+from .rendering import attach_html
+from .models import Post
+from .paginators import (
+    PageTooDeep, add_page_links, check_page_depth, filter_before, get_before,
+    get_page_number)
+from .views import get_comment_count_queryset, get_comments_page
+
+POSTS_PER_PAGE = 10
+
+
+def _run_and_close(func, *args):
+    try:
+        return func(*args)
+    finally:
+        # Рабочие потоки не получают сигнал request_finished,
+        # поэтому соединение с БД закрываем сами.
+        close_old_connections()
+
+
+async def run_query(func, *args):
+    """Выполняет синхронную функцию с запросами к БД в отдельном потоке."""
+    return await sync_to_async(
+        _run_and_close, thread_sensitive=False)(func, *args)
+
+
+async def get_request_user(request):
+    # request.user — ленивый объект, который обращается к сессии и БД;
+    # вычисляем его в синхронном потоке, дальше он уже закеширован.
+    await sync_to_async(lambda: request.user.is_authenticated)()
+    return request.user
+
+
+def redirect_deep_pages(view):
+    """Перенаправляет слишком глубокие страницы на навигацию по дате."""
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            return await view(request, *args, **kwargs)
+        except PageTooDeep as error:
+            return redirect(error.url)
+    return wrapper
+
+
+def published_posts():
+    # visible() читает кеш справочников, поэтому строится в потоке.
+    return Post.objects.select_related('author').visible()
+
+
+async def paginate_posts_async(posts, request, *queries,
+                               per_page=POSTS_PER_PAGE, scope=None):
+    """Считает посты и загружает страницу одновременно.
+
+    Дополнительные корутины из ``queries`` выполняются вместе с ними,
+    их результаты возвращаются вторым значением.
+    """
+    if get_before(request) is not None:
+        posts = filter_before(posts, request)
+        scope = None
+    count_queryset = posts.select_related(None)
+    listing = get_comment_count_queryset(
+        posts.defer('text')).order_by('-pub_date')
+    number = get_page_number(request)
+    if settings.MAX_PAGE_DEPTH and number > settings.MAX_PAGE_DEPTH:
+        await run_query(check_page_depth, listing, request, per_page)
+    bottom = (number - 1) * per_page
+    count, object_list, *extra = await asyncio.gather(
+        run_query(get_count, scope, count_queryset) if scope is not None
+        else run_query(count_queryset.count),
+        run_query(lambda: list(listing[bottom:bottom + per_page])),
+        *queries,
+    )
+    paginator = CountedPaginator(listing, per_page, scope=scope,
+                                 count_queryset=count_queryset)
+    # Подставляем уже посчитанное значение, чтобы не делать COUNT повторно.
+    paginator.count = count
+    if number > paginator.num_pages:
+        # Номер страницы вне диапазона: как get_page(), отдаём последнюю.
+        number = paginator.num_pages
+        bottom = (number - 1) * per_page
+        object_list = await run_query(
+            lambda: list(listing[bottom:bottom + per_page]))
+    # Категории и места карточек — из кеша справочников.
+    await run_query(load_related, get_loaders(request), object_list,
+                    'category', 'location')
+    page = add_page_links(Page(object_list, number, paginator), request)
+    return page, extra
+
+
+def get_list_context(page_obj):
+    return {
+        'page_obj': page_obj,
+        'paginator': page_obj.paginator,
+        'is_paginated': page_obj.has_other_pages(),
+        'object_list': page_obj.object_list,
+    }
+
+
+async def render_async(request, template_name, context):
+    return await sync_to_async(render)(request, template_name, context)
+
+
+@redirect_deep_pages
+async def index(request):
+    await get_request_user(request)
+    page_obj, _ = await paginate_posts_async(
+        await run_query(published_posts), request, scope=feed_scope())
+    return await render_async(
+        request, 'blog/index.html', get_list_context(page_obj))
+
+
+@redirect_deep_pages
+async def category_posts(request, slug):
+    await get_request_user(request)
+    category = await run_query(get_category_by_slug, slug)
+    if category is None or not category.is_published:
+        raise Http404('Категория не найдена.')
+    posts = (await run_query(published_posts)).filter(
+        category_id=category.pk)
+    page_obj, _ = await paginate_posts_async(
+        posts, request, scope=category_scope(category.pk))
+    context = get_list_context(page_obj)
+    context['category'] = category
+    return await render_async(request, 'blog/category.html', context)
+
+
+@redirect_deep_pages
+async def profile(request, username):
+    user = await get_request_user(request)
+    if user.is_authenticated and user.username == username:
+        # Свой профиль: показываем все посты, включая отложенные.
+        posts = Post.objects.select_related('author')
+    else:
+        posts = await run_query(published_posts)
+    posts = posts.filter(author__username=username)
+    page_obj, (profile_user,) = await paginate_posts_async(
+        posts, request,
+        run_query(get_user_model().objects.filter(
+            username=username).first),
+    )
+    if profile_user is None:
+        raise Http404('Пользователь не найден.')
+    context = get_list_context(page_obj)
+    context.update(profile=profile_user, object=profile_user)
+    return await render_async(request, 'blog/profile.html', context)
+
+
+async def post_detail(request, post_id):
+    user = await get_request_user(request)
+    posts = await run_query(Post.objects.visible)
+    if user.is_authenticated:
+        posts |= Post.objects.filter(author_id=user.pk)
+    post, comments_context = await asyncio.gather(
+        run_query(posts.filter(pk=post_id).first),
+        run_query(get_comments_page, post_id, request),
+    )
+    if post is None:
+        raise Http404('Публикация не найдена или недоступна.')
+    await run_query(load_related, get_loaders(request), [post],
+                    'category', 'location')
+    await run_query(load_related, get_loaders(request),
+                    [post, *comments_context['comments']], 'author')
+    await run_query(attach_html, [post, *comments_context['comments']])
+    context = {'post': post, 'object': post, **comments_context}
+    if user.is_authenticated:
+        context['form'] = CommentForm()
+    return await render_async(request, 'blog/detail.html', context)
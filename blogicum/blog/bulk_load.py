@@ -0,0 +1,463 @@
+"""Быстрая загрузка дампов в формате ``dumpdata`` (JSON или JSONL).
+
+В отличие от ``loaddata``, объекты не создаются и не сохраняются по одному.
+Дамп читается потоково, строки раскладываются по временным файлам
+моделей, а затем вставляются пачками через ``executemany`` в порядке
+зависимостей по ForeignKey (User → Category/Location → Post → Comment).
+"""
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime, timezone as dt_timezone
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.color import no_style
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .models import make_preview
+
+# Значения этих типов полей в дампе уже готовы к записи в БД.
+PASSTHROUGH_TYPES = {
+    'AutoField', 'BigAutoField', 'SmallAutoField', 'BooleanField',
+    'CharField', 'TextField', 'SlugField', 'IntegerField',
+    'BigIntegerField', 'SmallIntegerField', 'PositiveIntegerField',
+    'PositiveSmallIntegerField', 'PositiveBigIntegerField', 'FileField',
+    'FilePathField',
+}
+CHUNK_SIZE = 64 * 1024
+# Поля, которые модель вычисляет в save(): в старых дампах их нет.
+COMPUTED_FIELDS = {
+    'blog.post': {
+        'preview': lambda values: make_preview(values.get('text') or ''),
+    },
+}
+
+
+class BulkLoadError(Exception):
+    pass
+
+
+def iter_json_array(stream):
+    """Потоково разбирает JSON-массив объектов, не читая его целиком."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    eof = False
+    while True:
+        # Пропускаем пробелы, запятые и открывающую скобку массива.
+        while position < len(buffer) and (
+                buffer[position] in ' \t\r\n,'
+                or (not started and buffer[position] == '[')):
+            started = started or buffer[position] == '['
+            position += 1
+        if position < len(buffer) and buffer[position] == ']':
+            return
+        try:
+            obj, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                if buffer[position:].strip():
+                    raise BulkLoadError('Дамп обрывается на середине объекта.')
+                return
+            chunk = stream.read(CHUNK_SIZE)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield obj
+        position = end
+
+
+def iter_json_lines(stream):
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def iter_dump(stream):
+    """Определяет формат по первому символу: ``[`` — JSON, иначе JSONL."""
+    head = stream.read(1)
+    while head and head.isspace():
+        head = stream.read(1)
+    if not head:
+        return iter(())
+    if head == '[':
+        return iter_json_array(_Prefixed(head, stream))
+    return iter_json_lines(_Prefixed(head, stream))
+
+
+class _Prefixed:
+    """Возвращает уже прочитанный символ перед остатком потока."""
+
+    def __init__(self, prefix, stream):
+        self.prefix = prefix
+        self.stream = stream
+
+    def read(self, size=-1):
+        prefix, self.prefix = self.prefix, ''
+        return prefix + self.stream.read(size - len(prefix)
+                                         if size > 0 else size)
+
+    def __iter__(self):
+        prefix, self.prefix = self.prefix, ''
+        first = True
+        for line in self.stream:
+            yield (prefix + line) if first else line
+            first = False
+        if first and prefix:
+            yield prefix
+
+
+def sort_models(models):
+    """Топологическая сортировка моделей по ForeignKey между ними."""
+    models = set(models)
+    ordered = []
+    visiting = set()
+
+    def visit(model):
+        if model in ordered or model in visiting:
+            return
+        visiting.add(model)
+        for field in model._meta.concrete_fields:
+            related = field.related_model
+            if (field.many_to_one and related in models
+                    and related is not model):
+                visit(related)
+        visiting.discard(model)
+        ordered.append(model)
+
+    for model in sorted(models, key=lambda m: m._meta.label):
+        visit(model)
+    return ordered
+
+
+class ModelWriter:
+    """Готовит и вставляет строки одной модели."""
+
+    def __init__(self, model, connection, on_conflict):
+        self.model = model
+        self.connection = connection
+        opts = model._meta
+        self.pk = opts.pk
+        self.fields = [field for field in opts.local_concrete_fields
+                       if field is not self.pk]
+        self.computed = COMPUTED_FIELDS.get(opts.label_lower, {})
+        self.converters = [self.get_converter(field) for field in self.fields]
+        self.sql = {
+            True: self.build_sql([self.pk, *self.fields], on_conflict),
+            False: self.build_sql(self.fields, on_conflict),
+        }
+
+    def get_converter(self, field):
+        target = field.target_field if field.many_to_one else field
+        if target.get_internal_type() in PASSTHROUGH_TYPES:
+            return None
+        if (target.get_internal_type() == 'DateTimeField'
+                and self.connection.vendor == 'sqlite' and settings.USE_TZ):
+            return self.get_sqlite_datetime_converter(field)
+
+        def convert(value):
+            return field.get_db_prep_save(field.to_python(value),
+                                          self.connection)
+        return convert
+
+    def get_sqlite_datetime_converter(self, field):
+        """Быстрый разбор дат с часовым поясом в формат хранения SQLite.
+
+        Даты без пояса уходят в общий путь Django с make_aware.
+        """
+        def convert(value):
+            if value is None:
+                return None
+            if value.endswith('Z'):
+                value = value[:-1] + '+00:00'
+            try:
+                parsed = datetime.fromisoformat(value)
+            except ValueError:
+                parsed = None
+            if parsed is None or parsed.tzinfo is None:
+                return field.get_db_prep_save(field.to_python(value),
+                                              self.connection)
+            return str(parsed.astimezone(dt_timezone.utc).replace(
+                tzinfo=None))
+        return convert
+
+    def build_sql(self, fields, on_conflict):
+        quote = self.connection.ops.quote_name
+        if on_conflict == 'replace':
+            statement = 'INSERT OR REPLACE INTO'
+        else:
+            statement = self.connection.ops.insert_statement(
+                ignore_conflicts=on_conflict == 'ignore')
+        columns = ', '.join(quote(field.column) for field in fields)
+        placeholders = ', '.join(['%s'] * len(fields))
+        return (f'{statement} {quote(self.model._meta.db_table)} '
+                f'({columns}) VALUES ({placeholders})')
+
+    def get_default(self, field):
+        if getattr(field, 'auto_now', False) or getattr(
+                field, 'auto_now_add', False):
+            value = timezone.now()
+        else:
+            value = field.get_default()
+        return field.get_db_prep_save(value, self.connection)
+
+    def build_row(self, pk, values):
+        row = [] if pk is None else [self.pk.get_db_prep_save(
+            self.pk.to_python(pk), self.connection)]
+        for field, convert in zip(self.fields, self.converters):
+            if field.name in values:
+                value = values[field.name]
+            elif field.attname in values:
+                value = values[field.attname]
+            elif field.name in self.computed:
+                value = self.computed[field.name](values)
+            else:
+                row.append(self.get_default(field))
+                continue
+            row.append(value if convert is None else convert(value))
+        return row
+
+    def write(self, cursor, rows):
+        """Вставляет пачку; строки с pk и без pk — разными запросами."""
+        with_pk = [row for pk, row in rows if pk is not None]
+        without_pk = [row for pk, row in rows if pk is None]
+        if with_pk:
+            cursor.executemany(self.sql[True], with_pk)
+        if without_pk:
+            cursor.executemany(self.sql[False], without_pk)
+
+
+class Spool:
+    """Временные JSONL-файлы со строками дампа, по одному на модель."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.files = {}
+        self.counts = {}
+
+    def write(self, model, pk, fields):
+        if model not in self.files:
+            path = os.path.join(self.directory, model._meta.label_lower)
+            self.files[model] = open(path, 'w+', encoding='utf-8')
+            self.counts[model] = 0
+        self.files[model].write(json.dumps([pk, fields]) + '\n')
+        self.counts[model] += 1
+
+    def read(self, model):
+        spool_file = self.files[model]
+        spool_file.seek(0)
+        for line in spool_file:
+            yield json.loads(line)
+
+    def close(self):
+        for spool_file in self.files.values():
+            spool_file.close()
+
+
+def iter_rows(objects, exclude=()):
+    """Превращает объекты дампа в строки моделей, включая строки M2M-таблиц."""
+    models = {}
+    for obj in objects:
+        label = obj['model'].lower()
+        if label in exclude or label.split('.')[0] in exclude:
+            continue
+        if label not in models:
+            try:
+                models[label] = apps.get_model(label)
+            except LookupError:
+                raise BulkLoadError(f'Неизвестная модель {label}.')
+        model = models[label]
+        fields = dict(obj.get('fields', {}))
+        pk = obj.get('pk')
+        for m2m in model._meta.many_to_many:
+            targets = fields.pop(m2m.name, None)
+            through = m2m.remote_field.through
+            if not targets or not through._meta.auto_created:
+                continue
+            if pk is None:
+                raise BulkLoadError(
+                    f'Для M2M-поля {label}.{m2m.name} нужен pk объекта.')
+            source = through._meta.get_field(m2m.m2m_field_name()).attname
+            target = through._meta.get_field(
+                m2m.m2m_reverse_field_name()).attname
+            for target_pk in targets:
+                yield through, None, {source: pk, target: target_pk}
+        yield model, pk, fields
+
+
+class SqliteLoadSession:
+    """Отключает проверку FK и вторичные индексы SQLite на время загрузки.
+
+    Индексы таблицы удаляются при первой встрече её строк и создаются
+    заново в конце; внешние ключи проверяются один раз по всей базе.
+    """
+
+    def __init__(self, connection, drop_indexes=True):
+        self.connection = connection
+        self.drop_indexes = drop_indexes
+        self.tables = set()
+        self.indexes = []
+
+    def __enter__(self):
+        # Внутри внешней транзакции прагмы менять нельзя; ограничения FK
+        # в Django и так отложены до её фиксации.
+        self.pragmas = not self.connection.in_atomic_block
+        if self.pragmas:
+            with self.connection.cursor() as cursor:
+                cursor.execute('PRAGMA foreign_keys = OFF')
+                cursor.execute('PRAGMA synchronous = OFF')
+        return self
+
+    def prepare(self, model):
+        table = model._meta.db_table
+        if not self.drop_indexes or table in self.tables:
+            return
+        self.tables.add(table)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'index' "
+                'AND sql IS NOT NULL AND tbl_name = %s '
+                "AND sql NOT LIKE 'CREATE UNIQUE%%'", [table])
+            indexes = cursor.fetchall()
+            for name, _ in indexes:
+                cursor.execute(
+                    f'DROP INDEX {self.connection.ops.quote_name(name)}')
+        self.indexes.extend(indexes)
+
+    def __exit__(self, *exc_info):
+        with self.connection.cursor() as cursor:
+            for _, sql in self.indexes:
+                cursor.execute(sql)
+            if self.pragmas:
+                cursor.execute('PRAGMA synchronous = FULL')
+                cursor.execute('PRAGMA foreign_keys = ON')
+            cursor.execute('PRAGMA foreign_key_check')
+            violations = cursor.fetchall()
+        if violations and exc_info[0] is None:
+            table, rowid, parent, _ = violations[0]
+            raise BulkLoadError(
+                f'Нарушены внешние ключи: {len(violations)} строк, '
+                f'например {table} rowid={rowid} → {parent}.')
+
+
+class BatchWriter:
+    """Копит строки по моделям и сбрасывает их пачками в транзакциях."""
+
+    def __init__(self, connection, batch_size, transaction_size,
+                 on_conflict, progress=None, session=None):
+        self.connection = connection
+        self.batch_size = batch_size
+        self.transaction_size = transaction_size
+        self.on_conflict = on_conflict
+        self.progress = progress
+        self.session = session
+        self.writers = {}
+        self.buffers = {}
+        self.counts = {}
+        self.in_transaction = 0
+        self.atomic = None
+
+    def add(self, model, pk, values):
+        if model not in self.writers:
+            if self.session is not None:
+                self.session.prepare(model)
+            self.writers[model] = ModelWriter(
+                model, self.connection, self.on_conflict)
+            self.buffers[model] = []
+            self.counts[model] = 0
+        buffer = self.buffers[model]
+        buffer.append((pk, self.writers[model].build_row(pk, values)))
+        if len(buffer) >= self.batch_size:
+            self.flush(model)
+
+    def flush(self, model):
+        batch, self.buffers[model] = self.buffers[model], []
+        if not batch:
+            return
+        if self.atomic is None:
+            self.atomic = transaction.atomic(using=self.connection.alias)
+            self.atomic.__enter__()
+        with self.connection.cursor() as cursor:
+            self.writers[model].write(cursor, batch)
+        self.counts[model] += len(batch)
+        self.in_transaction += len(batch)
+        if self.progress is not None:
+            self.progress(model, self.counts[model])
+        if self.in_transaction >= self.transaction_size:
+            self.commit()
+
+    def commit(self):
+        if self.atomic is not None:
+            atomic, self.atomic = self.atomic, None
+            atomic.__exit__(None, None, None)
+        self.in_transaction = 0
+
+    def rollback(self, exc_info):
+        if self.atomic is not None:
+            atomic, self.atomic = self.atomic, None
+            atomic.__exit__(*exc_info)
+
+    def close(self):
+        for model in list(self.buffers):
+            self.flush(model)
+        self.commit()
+
+
+def bulk_load(stream, using='default', exclude=(), **options):
+    """Загружает дамп и возвращает число вставленных строк по моделям."""
+    return load_rows(iter_rows(iter_dump(stream), exclude), using, **options)
+
+
+def load_rows(rows, using='default', batch_size=5000,
+              transaction_size=50000, on_conflict='error',
+              drop_indexes=True, progress=None):
+    """Вставляет строки ``(model, pk, fields)`` пачками.
+
+    Значения полей — как в дампе dumpdata: ключи связей, даты строками.
+    На SQLite проверка FK отключается до конца загрузки, поэтому строки
+    пишутся сразу по мере поступления, без промежуточных файлов. На других
+    СУБД строки сначала раскладываются по временным файлам и вставляются
+    в порядке зависимостей моделей.
+    """
+    connection = connections[using]
+    if connection.vendor == 'sqlite':
+        with SqliteLoadSession(connection, drop_indexes) as session:
+            writer = BatchWriter(connection, batch_size, transaction_size,
+                                 on_conflict, progress, session)
+            write_rows(writer, rows)
+    else:
+        writer = BatchWriter(connection, batch_size, transaction_size,
+                             on_conflict, progress)
+        with tempfile.TemporaryDirectory(prefix='blog_bulk_load_') as path:
+            spool = Spool(path)
+            try:
+                for model, pk, values in rows:
+                    spool.write(model, pk, values)
+                for model in sort_models(spool.files):
+                    write_rows(writer, (
+                        (model, pk, values)
+                        for pk, values in spool.read(model)))
+            finally:
+                spool.close()
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(
+                no_style(), list(writer.writers)):
+            cursor.execute(sql)
+    return {model._meta.label: count
+            for model, count in writer.counts.items()}
+
+
+def write_rows(writer, rows):
+    try:
+        for model, pk, values in rows:
+            writer.add(model, pk, values)
+        writer.close()
+    except BaseException:
+        writer.rollback(sys.exc_info())
+        raise
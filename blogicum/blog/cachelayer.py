@@ -0,0 +1,127 @@
+"""Чтение из кеша без «эффекта толпы» (cache stampede).
+
+Когда популярная запись истекает, все процессы одновременно видят
+промах и пересчитывают её — на SQLite это десятки одинаковых тяжёлых
+запросов разом. ``get_or_set`` защищает от этого тремя приёмами:
+
+* single-flight: пересчитывает только тот, кто взял блокировку
+  (``cache.add`` атомарен в memcached, redis и locmem); остальные ждут
+  готового значения;
+* вероятностное раннее обновление (XFetch): незадолго до истечения
+  один из читателей с ростом вероятности пересчитывает запись заранее,
+  тем дольше, чем дороже был последний пересчёт;
+* stale-while-revalidate: истёкшее значение ещё ``stale_ttl`` секунд
+  отдаётся как есть, пока его обновляют в фоновом потоке.
+
+Подходит для любых кешируемых страниц и фрагментов блога.
+"""
+import logging
+import math
+import random
+import threading
+import time
+import uuid
+
+from django.core.cache import cache
+from django.db import close_old_connections
+
+logger = logging.getLogger('blog.cachelayer')
+
+MISSING = object()
+
+
+def lock_key(key):
+    return f'{key}:lock'
+
+
+def acquire(key, timeout):
+    """Берёт блокировку пересчёта; возвращает её метку или None."""
+    token = uuid.uuid4().hex
+    if cache.add(lock_key(key), token, timeout):
+        return token
+    return None
+
+
+def release(key, token):
+    if cache.get(lock_key(key)) == token:
+        cache.delete(lock_key(key))
+
+
+def wait_for(key, accept, timeout):
+    """Ждёт, пока другой процесс положит в кеш подходящую запись."""
+    deadline = time.monotonic() + timeout
+    pause = 0.005
+    while time.monotonic() < deadline:
+        entry = cache.get(key)
+        if entry is not None and accept(entry):
+            return entry
+        time.sleep(pause)
+        pause = min(pause * 2, 0.1)
+    return None
+
+
+def should_refresh(delta, expires, now, beta):
+    """XFetch: обновлять ли запись сейчас, не дожидаясь истечения."""
+    return now - delta * beta * math.log(random.random()) >= expires
+
+
+def compute_and_store(key, compute, ttl, stale_ttl):
+    started = time.monotonic()
+    value = compute()
+    delta = time.monotonic() - started
+    cache.set(key, (value, delta, time.time() + ttl), ttl + stale_ttl)
+    return value
+
+
+def refresh_in_background(key, token, compute, ttl, stale_ttl):
+    def run():
+        try:
+            compute_and_store(key, compute, ttl, stale_ttl)
+        except Exception:
+            logger.exception('Фоновое обновление %s не удалось', key)
+        finally:
+            release(key, token)
+            close_old_connections()
+
+    threading.Thread(target=run, name=f'refresh {key}', daemon=True).start()
+
+
+def get_or_set(key, compute, ttl, stale_ttl=0, beta=1.0, lock_timeout=30,
+               background=True):
+    """Значение из кеша или результат ``compute()``.
+
+    ``ttl`` — сколько секунд значение свежее, ``stale_ttl`` — сколько
+    ещё его можно отдавать, пока идёт обновление. ``lock_timeout`` —
+    предел времени пересчёта: дольше остальные не ждут и не блокируются.
+    С ``background=False`` устаревшее значение обновляется в потоке
+    запроса, а не в фоновом.
+    """
+    entry = cache.get(key)
+    now = time.time()
+    if entry is not None:
+        value, delta, expires = entry
+        if not should_refresh(delta, expires, now, beta):
+            return value
+        if now < expires + stale_ttl:
+            token = acquire(key, lock_timeout)
+            if token is None:
+                # Обновляет кто-то другой.
+                return value
+            if background:
+                refresh_in_background(key, token, compute, ttl, stale_ttl)
+                return value
+            try:
+                return compute_and_store(key, compute, ttl, stale_ttl)
+            finally:
+                release(key, token)
+    token = acquire(key, lock_timeout)
+    if token is not None:
+        try:
+            return compute_and_store(key, compute, ttl, stale_ttl)
+        finally:
+            release(key, token)
+    entry = wait_for(key, lambda entry: entry[2] > now, lock_timeout)
+    if entry is not None:
+        return entry[0]
+    logger.warning('Не дождались пересчёта %s, считаем сами', key)
+    return compute_and_store(key, compute, ttl, stale_ttl)
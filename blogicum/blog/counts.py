@@ -0,0 +1,143 @@
+"""Кешированные счётчики постов для пагинации лент.
+
+``Paginator.count`` на ленте — это COUNT(*) по соединению с группировкой
+ради одной цифры «сколько страниц». Здесь число постов считается по
+«области» (scope): общая лента, категория, автор — и хранится в кеше
+Django.
+
+* Точные области (категория, автор) сбрасываются сигналами при каждом
+  сохранении или удалении поста. Запись живёт не дольше момента, когда
+  в области станет видим ближайший отложенный пост, поэтому число
+  остаётся точным и без записей в базу.
+* Общая лента приблизительна: её число пересчитывается раз в
+  ``FEED_COUNT_TTL`` секунд одним процессом (``cachelayer``), новые
+  посты на число страниц там почти не влияют.
+
+Массовые операции в обход сигналов (прямые DELETE, UPDATE, загрузка
+дампов) вызывают ``invalidate_all``; правка категорий сбрасывает все
+счётчики через версию справочников.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import Min
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .cachelayer import get_or_set
+from .models import Post
+from .reference import get_version
+
+VERSION_KEY = 'blog:counts:version'
+
+
+class CountScope:
+    def __init__(self, name, filters=None, exact=True, scheduled=True):
+        self.name = name
+        self.filters = filters or {}
+        self.exact = exact
+        # Учитывает ли область отложенные посты, которые станут видимы.
+        self.scheduled = scheduled
+
+    def __repr__(self):
+        return f'<CountScope {self.name}>'
+
+    def cache_key(self):
+        counts_version = cache.get(VERSION_KEY, 0)
+        return (f'blog:counts:{get_version()}:{counts_version}:'
+                f'{self.name}')
+
+    def valid_until(self, now):
+        """До какого момента посчитанное сейчас число останется верным."""
+        if not self.exact:
+            return now + timedelta(seconds=settings.FEED_COUNT_TTL)
+        if not self.scheduled:
+            return None
+        return Post.objects.filter(
+            pub_date__gt=now, is_published=True, **self.filters
+        ).aggregate(next_pub_date=Min('pub_date'))['next_pub_date']
+
+
+def feed_scope():
+    return CountScope('feed', exact=False)
+
+
+def category_scope(category_id):
+    return CountScope(f'category:{category_id}',
+                      {'category_id': category_id})
+
+
+def author_scope(author_id, include_hidden=False):
+    if include_hidden:
+        # Автор видит все свои посты, от времени число не зависит.
+        return CountScope(f'author:{author_id}:all', scheduled=False)
+    return CountScope(f'author:{author_id}', {'author_id': author_id})
+
+
+def get_count(scope, queryset):
+    """Число постов области: из кеша или COUNT(*) по queryset."""
+    key = scope.cache_key()
+    if not scope.exact:
+        # Приблизительное число можно отдавать устаревшим, пока его
+        # пересчитывает один процесс.
+        return get_or_set(key, queryset.count, settings.FEED_COUNT_TTL,
+                          stale_ttl=settings.FEED_COUNT_TTL)
+    now = timezone.now()
+    entry = cache.get(key)
+    if entry is not None:
+        count, valid_until = entry
+        if valid_until is None or valid_until > now.timestamp():
+            return count
+    count = queryset.count()
+    valid_until = scope.valid_until(now)
+    timeout = None
+    if valid_until is not None:
+        timeout = max(int((valid_until - now).total_seconds()) + 1, 1)
+        valid_until = valid_until.timestamp()
+    cache.set(key, (count, valid_until), timeout)
+    return count
+
+
+def invalidate_post(post, category_id=None, author_id=None):
+    """Сбрасывает точные области, которых касается пост."""
+    keys = {
+        category_scope(post.category_id).cache_key(),
+        author_scope(post.author_id).cache_key(),
+        author_scope(post.author_id, include_hidden=True).cache_key(),
+    }
+    if category_id is not None:
+        keys.add(category_scope(category_id).cache_key())
+    if author_id is not None:
+        keys.add(author_scope(author_id).cache_key())
+        keys.add(author_scope(author_id, include_hidden=True).cache_key())
+    cache.delete_many(keys)
+
+
+def invalidate_all():
+    cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+class CountedPaginator(Paginator):
+    """Пагинатор, который берёт число объектов из счётчика области.
+
+    ``count_queryset`` — тот же набор постов без аннотаций и сортировки:
+    считать его намного дешевле, чем ленту с числом комментариев.
+    """
+
+    def __init__(self, object_list, per_page, scope=None,
+                 count_queryset=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.scope = scope
+        self.count_queryset = count_queryset
+
+    @cached_property
+    def count(self):
+        queryset = self.count_queryset
+        if queryset is None:
+            return super().count
+        if self.scope is None:
+            return queryset.count()
+        return get_count(self.scope, queryset)
@@ -0,0 +1,148 @@
+"""Быстрое каскадное удаление постов и пользователей.
+
+Стандартный ``delete()`` собирает все зависимые объекты в память и
+отправляет сигналы для каждого. Здесь комментарии и посты удаляются
+прямыми DELETE пачками по первичному ключу в одной транзакции; сигналы
+``pre_delete``/``post_delete`` для них не отправляются. Файлы картинок
+удаляет из хранилища фоновая задача, поставленная в той же транзакции.
+"""
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, models, transaction
+
+from .counts import invalidate_all, invalidate_post
+from .hotcache import invalidate_post_detail
+from .pagecache import invalidate_feeds
+from .models import Comment, Post
+from .tasks import delete_files
+
+CHUNK_SIZE = 1000
+
+
+def iter_pk_chunks(queryset, chunk_size):
+    """Пачки pk по возрастанию; строки предыдущей пачки уже удалены."""
+    queryset = queryset.order_by('pk').values_list('pk', flat=True)
+    last_pk = None
+    while True:
+        chunk_queryset = queryset
+        if last_pk is not None:
+            chunk_queryset = chunk_queryset.filter(pk__gt=last_pk)
+        chunk = list(chunk_queryset[:chunk_size])
+        if not chunk:
+            return
+        last_pk = chunk[-1]
+        yield chunk
+
+
+def raw_delete(model, using, **lookups):
+    return model._base_manager.using(using).filter(**lookups)._raw_delete(
+        using)
+
+
+def delete_files_later(names):
+    """Удаляет файлы в фоне; задача пропадёт, если транзакция откатится."""
+    if names:
+        delete_files.delay(names)
+
+
+def delete_posts(queryset, using=DEFAULT_DB_ALIAS, chunk_size=CHUNK_SIZE,
+                 progress=None):
+    """Удаляет посты queryset вместе с их комментариями.
+
+    ``progress(model_name, deleted)`` вызывается после каждой пачки.
+    Возвращает число удалённых строк по моделям, как ``delete()``.
+    """
+    counts = {'comment': 0, 'post': 0}
+    images = []
+    with transaction.atomic(using=using):
+        for chunk in iter_pk_chunks(queryset.using(using), chunk_size):
+            images.extend(
+                name for name in Post._base_manager.using(using).filter(
+                    pk__in=chunk).exclude(image='').values_list(
+                        'image', flat=True)
+            )
+            counts['comment'] += raw_delete(
+                Comment, using, post_id__in=chunk)
+            counts['post'] += raw_delete(Post, using, pk__in=chunk)
+            if progress is not None:
+                progress('post', counts['post'])
+        delete_files_later(images)
+    # Сигналы не отправлялись, счётчики лент сбрасываем сами.
+    invalidate_all()
+    return counts
+
+
+def delete_post(post, using=DEFAULT_DB_ALIAS):
+    """Удаляет уже загруженный пост без поиска его pk и картинки."""
+    with transaction.atomic(using=using):
+        counts = {
+            'comment': raw_delete(Comment, using, post_id=post.pk),
+            'post': raw_delete(Post, using, pk=post.pk),
+        }
+        delete_files_later([post.image.name] if post.image else [])
+    invalidate_post(post)
+    invalidate_post_detail(post.pk)
+    invalidate_feeds()
+    return counts
+
+
+def delete_user(user, using=DEFAULT_DB_ALIAS, chunk_size=CHUNK_SIZE,
+                progress=None):
+    """Удаляет пользователя, его комментарии, посты и комментарии к ним."""
+    counts = {'comment': 0}
+    with transaction.atomic(using=using):
+        own_comments = Comment._base_manager.filter(author_id=user.pk)
+        for chunk in iter_pk_chunks(own_comments.using(using), chunk_size):
+            counts['comment'] += raw_delete(Comment, using, pk__in=chunk)
+            if progress is not None:
+                progress('comment', counts['comment'])
+        post_counts = delete_posts(
+            Post._base_manager.filter(author_id=user.pk), using, chunk_size,
+            progress)
+        counts['comment'] += post_counts['comment']
+        counts['post'] = post_counts['post']
+        delete_user_row(user, using)
+        counts['user'] = 1
+    return counts
+
+
+def delete_user_row(user, using=DEFAULT_DB_ALIAS):
+    """Удаляет строку пользователя и прямые ссылки на неё (группы, права,
+    журнал админки); посты и комментарии уже должны быть удалены.
+
+    Связи, которые нельзя удалить одним DELETE (SET_NULL, PROTECT,
+    вложенный каскад), обрабатывает стандартный ``delete()``.
+    """
+    User = get_user_model()
+    relations = [
+        relation for relation in User._meta.related_objects
+        if relation.related_model not in (Post, Comment)
+    ]
+    if any(relation.many_to_many
+           or relation.on_delete is not models.CASCADE
+           or relation.related_model._meta.related_objects
+           for relation in relations):
+        User._base_manager.using(using).filter(pk=user.pk).delete()
+        return
+    for field in User._meta.many_to_many:
+        raw_delete(field.remote_field.through, using,
+                   **{field.m2m_field_name(): user.pk})
+    for relation in relations:
+        raw_delete(relation.related_model, using,
+                   **{relation.field.attname: user.pk})
+    raw_delete(User, using, pk=user.pk)
+
+
+def deletion_summary(posts=None, user=None, using=DEFAULT_DB_ALIAS):
+    """Сводка для подтверждения удаления без загрузки всех объектов."""
+    if user is not None:
+        posts = Post.objects.filter(author_id=user.pk)
+    posts = posts.using(using)
+    comments = Comment.objects.using(using).filter(
+        post_id__in=posts.values('pk'))
+    if user is not None:
+        comments = comments | Comment.objects.using(using).filter(
+            author_id=user.pk)
+    return {
+        Post._meta.verbose_name_plural: posts.count(),
+        Comment._meta.verbose_name_plural: comments.count(),
+    }
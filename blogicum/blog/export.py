@@ -0,0 +1,266 @@
+"""Потоковая выгрузка постов, комментариев и справочников.
+
+Строки читаются курсором на стороне сервера (``.iterator(chunk_size)``)
+в порядке первичного ключа и сразу пишутся в файл, поэтому память не
+зависит от размера базы. После каждой пачки сохраняется контрольная
+точка — последний выгруженный pk, с которого выгрузку можно продолжить.
+"""
+import csv
+import json
+import os
+from datetime import date, datetime
+from decimal import Decimal
+
+from .models import Category, Comment, Location, Post
+
+EXPORT_MODELS = {
+    'category': Category,
+    'location': Location,
+    'post': Post,
+    'comment': Comment,
+}
+CHECKPOINT_NAME = '.checkpoint.json'
+
+
+class ExportError(Exception):
+    pass
+
+
+def get_columns(model):
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+def to_plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def filter_queryset(model, queryset, since=None, until=None, category=None,
+                    author=None):
+    """Применяет фильтры выгрузки к модели, если они к ней применимы."""
+    date_field = 'pub_date' if model is Post else 'created_at'
+    if since is not None:
+        queryset = queryset.filter(**{f'{date_field}__gte': since})
+    if until is not None:
+        queryset = queryset.filter(**{f'{date_field}__lt': until})
+    if category is not None:
+        lookups = {
+            Post: 'category__slug',
+            Comment: 'post__category__slug',
+            Category: 'slug',
+        }
+        if model in lookups:
+            queryset = queryset.filter(**{lookups[model]: category})
+    if author is not None and model in (Post, Comment):
+        queryset = queryset.filter(author__username=author)
+    return queryset
+
+
+def iter_rows(queryset, columns, chunk_size=2000):
+    """Строки выгрузки из курсора на стороне сервера, по порядку pk."""
+    rows = queryset.order_by('pk').values_list(*columns).iterator(
+        chunk_size=chunk_size)
+    for row in rows:
+        yield [to_plain(value) for value in row]
+
+
+class JsonlWriter:
+    extension = 'jsonl'
+    # Контрольная точка сохраняется после каждой пачки.
+    checkpoint_each_batch = True
+
+    def __init__(self, path, columns, append=False, offset=None):
+        self.columns = columns
+        self.file = open(path, 'a' if append else 'w', encoding='utf-8')
+        if append and offset is not None:
+            # Отбрасываем строки, записанные после последней контрольной
+            # точки, чтобы при продолжении они не задвоились.
+            self.file.truncate(offset)
+            self.file.seek(offset)
+
+    def write(self, rows):
+        for row in rows:
+            self.file.write(json.dumps(dict(zip(self.columns, row)),
+                                       ensure_ascii=False) + '\n')
+
+    def flush(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+class CsvWriter(JsonlWriter):
+    extension = 'csv'
+
+    def __init__(self, path, columns, append=False, offset=None):
+        append = append and os.path.exists(path)
+        super().__init__(path, columns, append, offset)
+        self.writer = csv.writer(self.file)
+        if not append:
+            self.writer.writerow(columns)
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+
+class ParquetWriter:
+    """Колоночная выгрузка в Parquet; нужен необязательный pyarrow.
+
+    Parquet нельзя дописывать, а незакрытый файл непригоден для чтения,
+    поэтому контрольная точка сохраняется только после закрытия файла
+    модели, а продолженная выгрузка пишет следующую часть отдельно.
+    """
+
+    extension = 'parquet'
+    checkpoint_each_batch = False
+
+    def __init__(self, path, columns, append=False, offset=None):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ExportError(
+                'Для формата parquet установите пакет pyarrow.')
+        self.pa = pyarrow
+        self.columns = columns
+        if append:
+            base, extension = os.path.splitext(path)
+            part = 1
+            while os.path.exists(f'{base}.part{part}{extension}'):
+                part += 1
+            path = f'{base}.part{part}{extension}'
+        self.path = path
+        self.writer = None
+        self.pq = pyarrow.parquet
+
+    def write(self, rows):
+        rows = list(rows)
+        if not rows:
+            return
+        # Каждая пачка становится группой строк (row group) файла.
+        table = self.pa.table({
+            name: [row[index] for row in rows]
+            for index, name in enumerate(self.columns)
+        })
+        if self.writer is None:
+            self.writer = self.pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def flush(self):
+        return None
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+WRITERS = {
+    'jsonl': JsonlWriter,
+    'csv': CsvWriter,
+    'parquet': ParquetWriter,
+}
+
+
+class Checkpoint:
+    """Последние выгруженные pk по моделям в каталоге выгрузки."""
+
+    def __init__(self, directory, options):
+        self.path = os.path.join(directory, CHECKPOINT_NAME)
+        self.options = options
+        self.positions = {}
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, encoding='utf-8') as checkpoint_file:
+            data = json.load(checkpoint_file)
+        if data.get('options') != self.options:
+            raise ExportError(
+                'Контрольная точка сделана с другими параметрами выгрузки.')
+        self.positions = data['positions']
+        return True
+
+    def save(self):
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w', encoding='utf-8') as checkpoint_file:
+            json.dump({'options': self.options, 'positions': self.positions},
+                      checkpoint_file)
+        os.replace(temporary, self.path)
+
+
+def export_model(model, queryset, writer, checkpoint=None, name=None,
+                 chunk_size=2000, progress=None):
+    """Выгружает queryset пачками, сохраняя контрольную точку после каждой."""
+    pk_index = writer.columns.index(model._meta.pk.attname)
+    position = (checkpoint.positions.get(name)
+                if checkpoint is not None else None)
+    if position is not None:
+        queryset = queryset.filter(pk__gt=position['pk'])
+    exported = 0
+    batch = []
+    rows = iter_rows(queryset, writer.columns, chunk_size)
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            exported += len(batch)
+            position = flush_batch(writer, batch, pk_index, position)
+            if writer.checkpoint_each_batch:
+                save_position(checkpoint, name, position)
+            batch = []
+            if progress is not None:
+                progress(name, exported)
+    exported += len(batch)
+    position = flush_batch(writer, batch, pk_index, position)
+    writer.close()
+    save_position(checkpoint, name, position)
+    return exported
+
+
+def flush_batch(writer, batch, pk_index, position):
+    if not batch:
+        return position
+    writer.write(batch)
+    return {'pk': batch[-1][pk_index], 'offset': writer.flush()}
+
+
+def save_position(checkpoint, name, position):
+    if checkpoint is not None and position is not None:
+        checkpoint.positions[name] = position
+        checkpoint.save()
+
+
+def export_corpus(directory, models, file_format='jsonl', chunk_size=2000,
+                  resume=False, progress=None, **filters):
+    """Выгружает модели в каталог, по файлу на модель."""
+    os.makedirs(directory, exist_ok=True)
+    options = {
+        'format': file_format,
+        'models': list(models),
+        'filters': {key: str(value) for key, value in filters.items()
+                    if value is not None},
+    }
+    checkpoint = Checkpoint(directory, options)
+    append = resume and checkpoint.load()
+    writer_class = WRITERS[file_format]
+    result = {}
+    for name in models:
+        model = EXPORT_MODELS[name]
+        path = os.path.join(directory, f'{name}.{writer_class.extension}')
+        position = checkpoint.positions.get(name) or {}
+        writer = writer_class(path, get_columns(model),
+                              append and name in checkpoint.positions,
+                              position.get('offset'))
+        try:
+            queryset = filter_queryset(model, model.objects.all(), **filters)
+            result[name] = export_model(model, queryset, writer, checkpoint,
+                                        name, chunk_size, progress)
+        finally:
+            writer.close()
+    return result
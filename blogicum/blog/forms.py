@@ -6,7 +6,23 @@ from .models import Post, Comment
 User = get_user_model()
 
 
-class PostForm(forms.ModelForm):
+class VersionedFormMixin:
+    """Скрытое обязательное поле версии у формы правки.
+
+    По нему ``VersionedUpdateMixin`` узнаёт, какую версию записи правил
+    пользователь. У формы создания поля нет.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk is None:
+            return
+        self.fields['version'] = forms.IntegerField(
+            min_value=0, widget=forms.HiddenInput)
+        self.initial.setdefault('version', self.instance.version)
+
+
+class PostForm(VersionedFormMixin, forms.ModelForm):
     class Meta:
         # Указываем модель, на основе которой должна строиться форма.
         model = Post
@@ -32,7 +48,7 @@ class PostForm(forms.ModelForm):
         return pub_date
 
 
-class CommentForm(forms.ModelForm):
+class CommentForm(VersionedFormMixin, forms.ModelForm):
     class Meta:
         # Указываем модель, на основе которой должна строиться форма.
         model = Comment
@@ -0,0 +1,171 @@
+"""Двухуровневый кеш собранных данных страницы поста.
+
+Популярный пост открывают тысячи раз в минуту, и каждый раз заново
+загружаются пост, автор и первая порция комментариев. Здесь собранные
+данные хранятся в общем кеше Django, а перед ним в каждом процессе
+стоит ограниченный LRU: по числу записей, по байтам и по времени жизни.
+
+Записи хранятся сериализованными: объекты из кеша у каждого запроса
+свои, их можно дополнять, а объём памяти считается точно.
+
+Актуальность проверяется по версии в общем кеше — одно обращение
+``get_many`` на запрос. Версию поста меняют сигналы ``Post``,
+``Comment`` и смена имени автора; массовые правки в обход сигналов вызывают
+``counts.invalidate_all``, чья версия тоже входит в проверку.
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import cachelayer, counts
+
+# Примерные накладные расходы на запись помимо самих данных.
+ENTRY_OVERHEAD = 200
+
+
+class LRUCache:
+    """Потокобезопасный LRU с ограничением по числу записей и байтам."""
+
+    def __init__(self, max_items, max_bytes, ttl):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.size = 0
+        self.evictions = 0
+
+    def get(self, key, version):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, entry_version, blob = entry
+            if entry_version != version or expires < time.monotonic():
+                self.remove(key)
+                return None
+            self.entries.move_to_end(key)
+            return blob
+
+    def set(self, key, version, blob):
+        entry_size = len(blob) + ENTRY_OVERHEAD
+        if entry_size > self.max_bytes:
+            return
+        with self.lock:
+            self.remove(key)
+            self.entries[key] = (time.monotonic() + self.ttl, version, blob)
+            self.size += entry_size
+            while (len(self.entries) > self.max_items
+                   or self.size > self.max_bytes):
+                oldest = next(iter(self.entries))
+                self.remove(oldest)
+                self.evictions += 1
+
+    def remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[2]) + ENTRY_OVERHEAD
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+class TieredCache:
+    """Локальный LRU перед общим кешем с проверкой версии записи."""
+
+    def __init__(self, prefix, max_items, max_bytes, local_ttl,
+                 shared_ttl, build_timeout=10):
+        self.prefix = prefix
+        self.local = LRUCache(max_items, max_bytes, local_ttl)
+        self.shared_ttl = shared_ttl
+        self.build_timeout = build_timeout
+        self.lock = threading.Lock()
+        self.local_hits = self.shared_hits = self.misses = 0
+
+    def data_key(self, key):
+        return f'{self.prefix}:{key}'
+
+    def version_key(self, key):
+        return f'{self.prefix}:{key}:version'
+
+    def get_version(self, key):
+        versions = cache.get_many([self.version_key(key),
+                                   counts.VERSION_KEY])
+        return (versions.get(self.version_key(key), 0),
+                versions.get(counts.VERSION_KEY, 0))
+
+    def get_or_build(self, key, build):
+        """Возвращает данные и уровень, откуда они взяты.
+
+        Уровень — ``'local'``, ``'shared'`` или ``'miss'``.
+        """
+        version = self.get_version(key)
+        blob = self.local.get(key, version)
+        if blob is not None:
+            self.count('local_hits')
+            return pickle.loads(blob), 'local'
+        entry = cache.get(self.data_key(key))
+        if entry is not None and entry[0] == version:
+            blob = entry[1]
+            self.local.set(key, version, blob)
+            self.count('shared_hits')
+            return pickle.loads(blob), 'shared'
+        # Собирает один процесс, остальные ждут его результата.
+        previous = entry[0] if entry is not None else None
+        token = cachelayer.acquire(self.data_key(key), self.build_timeout)
+        if token is None:
+            # Ждём любую новую запись; если её собрали по другой версии,
+            # собираем сами.
+            entry = cachelayer.wait_for(
+                self.data_key(key), lambda entry: entry[0] != previous,
+                self.build_timeout)
+            if entry is not None and entry[0] == version:
+                self.local.set(key, version, entry[1])
+                self.count('shared_hits')
+                return pickle.loads(entry[1]), 'shared'
+        try:
+            # Версия прочитана до сборки: если данные поменяются, пока мы
+            # собираем, запись окажется устаревшей и не будет использована.
+            data = build()
+            blob = pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+            cache.set(self.data_key(key), (version, blob), self.shared_ttl)
+        finally:
+            if token is not None:
+                cachelayer.release(self.data_key(key), token)
+        self.local.set(key, version, blob)
+        self.count('misses')
+        return data, 'miss'
+
+    def invalidate(self, key):
+        cache.set(self.version_key(key), time.time_ns(), None)
+
+    def count(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def stats(self):
+        total = self.local_hits + self.shared_hits + self.misses
+        return {
+            'local_hits': self.local_hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+            'hit_ratio': ((self.local_hits + self.shared_hits) / total
+                          if total else 0.0),
+            'local_items': len(self.local.entries),
+            'local_bytes': self.local.size,
+            'evictions': self.local.evictions,
+        }
+
+
+post_detail_cache = TieredCache(
+    'blog:hot:post', **settings.POST_DETAIL_CACHE)
+
+
+def invalidate_post_detail(post_id):
+    post_detail_cache.invalidate(post_id)
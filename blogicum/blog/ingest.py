@@ -0,0 +1,135 @@
+"""Буферизованная запись комментариев с групповой фиксацией.
+
+В этом режиме ``CommentCreateView`` не пишет комментарий в базу сам, а
+кладёт проверенный объект в очередь процесса. Фоновый поток раз в
+``COMMENT_BUFFER_INTERVAL`` секунд забирает всё накопившееся (не больше
+``COMMENT_BUFFER_BATCH_SIZE``) и сохраняет одним ``bulk_create`` в одной
+транзакции — одна фиксация и один fsync на пачку вместо каждого запроса.
+
+Пока комментарий не сохранён, автор видит его на странице поста: буфер
+помнит несохранённые комментарии по посту и автору. Это состояние
+процесса, поэтому с несколькими процессами автор увидит свой
+комментарий сразу, только если запрос попадёт в тот же процесс.
+При аварийной остановке процесса несохранённые комментарии теряются.
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, transaction
+from django.utils import timezone
+
+from .hotcache import invalidate_post_detail
+from .pagecache import invalidate_feeds
+from .models import Comment
+
+logger = logging.getLogger('blog.ingest')
+
+
+class CommentBuffer:
+    def __init__(self, interval=0.005, batch_size=500):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.thread = None
+        self.flushed = 0
+
+    def add(self, comment):
+        comment.created_at = timezone.now()
+        with self.lock:
+            self.pending.setdefault(
+                (comment.post_id, comment.author_id), []).append(comment)
+        self.queue.put(comment)
+        self.start()
+
+    def pending_for(self, post_id, author_id):
+        with self.lock:
+            return list(self.pending.get((post_id, author_id), ()))
+
+    def start(self):
+        if self.thread is not None and self.thread.is_alive():
+            return
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self.run, name='comment-buffer', daemon=True)
+                self.thread.start()
+
+    def run(self):
+        while True:
+            first = self.queue.get()
+            # Даём запросам, пришедшим следом, попасть в ту же пачку.
+            time.sleep(self.interval)
+            self.flush([first])
+            close_old_connections()
+
+    def drain(self, batch):
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def flush(self, batch=None):
+        """Сохраняет накопленные комментарии; возвращает их число."""
+        saved = 0
+        batch = self.drain(batch or [])
+        while batch:
+            saved += self.write(batch)
+            batch = self.drain([])
+        return saved
+
+    def write(self, batch):
+        try:
+            with transaction.atomic():
+                Comment.objects.bulk_create(batch)
+            saved = batch
+        except DatabaseError:
+            # Например, пост удалили, пока комментарий ждал в очереди:
+            # сохраняем пачку по одному, чтобы потерять только его.
+            logger.warning('Групповая запись не удалась, пишем по одному',
+                           exc_info=True)
+            saved = []
+            for comment in batch:
+                try:
+                    with transaction.atomic():
+                        comment.save(force_insert=True)
+                    saved.append(comment)
+                except DatabaseError:
+                    logger.exception('Комментарий отброшен: %r', comment.text)
+        self.forget(batch)
+        # bulk_create не отправляет post_save.
+        for post_id in {comment.post_id for comment in saved}:
+            invalidate_post_detail(post_id)
+        if saved:
+            invalidate_feeds()
+        self.flushed += len(saved)
+        return len(saved)
+
+    def forget(self, batch):
+        with self.lock:
+            for comment in batch:
+                key = (comment.post_id, comment.author_id)
+                comments = self.pending.get(key, [])
+                if comment in comments:
+                    comments.remove(comment)
+                if not comments:
+                    self.pending.pop(key, None)
+
+
+comment_buffer = CommentBuffer(
+    interval=getattr(settings, 'COMMENT_BUFFER_INTERVAL', 0.005),
+    batch_size=getattr(settings, 'COMMENT_BUFFER_BATCH_SIZE', 500),
+)
+
+
+@atexit.register
+def flush_on_exit():
+    if comment_buffer.pending:
+        comment_buffer.flush()
@@ -0,0 +1,133 @@
+"""Пакетная загрузка связанных объектов и identity map в рамках запроса.
+
+Вместо того чтобы каждая карточка или комментарий лениво дотягивали
+автора, категорию и местоположение отдельным запросом, view сначала
+собирает все нужные ключи, а затем загружает объекты каждой модели
+одним запросом ``WHERE id IN (...)``. Уже загруженные объекты
+запоминаются и повторно в рамках запроса не запрашиваются: одна
+и та же категория десяти карточек — это один объект на весь запрос.
+Реестр загрузчиков создаётся ``IdentityMapMiddleware`` и считает
+попадания (hits) и промахи (misses) по каждой модели.
+"""
+from django.core.exceptions import FieldDoesNotExist
+
+from .reference import reference_cache
+
+
+class DataLoader:
+    """Загрузчик объектов одной модели по первичному ключу."""
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+        self.cache = {}
+        self.queue = set()
+        self.queries = 0
+        self.hits = 0
+        self.misses = 0
+
+    def prime(self, obj):
+        """Запоминает объект, уже полученный другим запросом."""
+        self.cache.setdefault(obj.pk, obj)
+        self.queue.discard(obj.pk)
+
+    def enqueue(self, key):
+        if key is None:
+            return
+        if key in self.cache or key in self.queue:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self.queue.add(key)
+
+    def dispatch(self):
+        """Загружает все накопленные ключи одним запросом."""
+        if not self.queue:
+            return
+        keys, self.queue = self.queue, set()
+        self.queries += 1
+        self.cache.update(self.queryset.in_bulk(keys))
+
+    def load_many(self, keys):
+        for key in keys:
+            self.enqueue(key)
+        self.dispatch()
+        return {key: self.cache.get(key) for key in keys}
+
+    def load(self, key):
+        return self.load_many([key])[key]
+
+
+class ReferenceLoader(DataLoader):
+    """Загрузчик справочника: берёт объекты из кеша процесса."""
+
+    def dispatch(self):
+        if not self.queue:
+            return
+        found = reference_cache.get_many(self.queryset.model, self.queue)
+        self.cache.update(found)
+        self.queue -= found.keys()
+        # Запись могла появиться после последнего обновления кеша.
+        super().dispatch()
+
+
+class LoaderRegistry:
+    """Набор загрузчиков одного запроса, по одному на модель."""
+
+    def __init__(self):
+        self.loaders = {}
+
+    def for_model(self, model):
+        if model not in self.loaders:
+            loader_class = (ReferenceLoader if model in reference_cache.tables
+                            else DataLoader)
+            self.loaders[model] = loader_class(model._default_manager.all())
+        return self.loaders[model]
+
+    def stats(self):
+        return {
+            model.__name__: {
+                'hits': loader.hits,
+                'misses': loader.misses,
+                'queries': loader.queries,
+            }
+            for model, loader in self.loaders.items()
+        }
+
+
+def get_loaders(request):
+    """Возвращает загрузчики, привязанные к текущему запросу."""
+    if not hasattr(request, '_blog_loaders'):
+        request._blog_loaders = LoaderRegistry()
+    return request._blog_loaders
+
+
+def load_related(loaders, objects, *field_names):
+    """Проставляет объектам связанные объекты по ForeignKey-полям.
+
+    Объекты могут быть разных моделей: ключи для одной связанной модели
+    (например, авторы поста и комментариев) загружаются одним запросом.
+    """
+    links = []
+    for obj in objects:
+        for name in field_names:
+            try:
+                field = obj._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if not field.many_to_one:
+                continue
+            loader = loaders.for_model(field.related_model)
+            if field.is_cached(obj):
+                # Объект уже пришёл через select_related — запоминаем его.
+                related = field.get_cached_value(obj)
+                if related is not None:
+                    loader.prime(related)
+                continue
+            loader.enqueue(getattr(obj, field.attname))
+            links.append((obj, field, loader))
+    for loader in loaders.loaders.values():
+        loader.dispatch()
+    for obj, field, loader in links:
+        field.set_cached_value(
+            obj, loader.cache.get(getattr(obj, field.attname)))
+    return objects
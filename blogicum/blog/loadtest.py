@@ -0,0 +1,161 @@
+"""Нагрузочные прогоны и бенчмарк страниц через тестовые клиенты Django."""
+import asyncio
+import statistics
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection, reset_queries
+from django.db.models import Count
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext
+
+
+def percentile(values, percent):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(len(ordered) * percent / 100))
+    return ordered[index]
+
+
+def summarize(latencies, elapsed, errors=0):
+    """Сводка прогона: пропускная способность и задержки в миллисекундах."""
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'elapsed_s': round(elapsed, 3),
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'mean_ms': round(statistics.mean(latencies) * 1000, 2)
+        if latencies else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def run_wsgi(urls, total, concurrency):
+    """Отправляет total запросов пулом потоков, как WSGI-сервер с воркерами."""
+    clients = [Client() for _ in range(concurrency)]
+
+    def worker(index):
+        client = clients[index % concurrency]
+        url = urls[index % len(urls)]
+        started = time.perf_counter()
+        response = client.get(url)
+        return time.perf_counter() - started, response.status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(worker, range(total)))
+    elapsed = time.perf_counter() - started
+    errors = sum(1 for _, status in results if status >= 500)
+    return summarize([latency for latency, _ in results], elapsed, errors)
+
+
+def run_asgi(urls, total, concurrency):
+    """Отправляет total запросов в одном цикле событий через ASGIHandler."""
+
+    async def main():
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(index):
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(urls[index % len(urls)])
+                return time.perf_counter() - started, response.status_code
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(one(i) for i in range(total)))
+        return results, time.perf_counter() - started
+
+    results, elapsed = asyncio.run(main())
+    errors = sum(1 for _, status in results if status >= 500)
+    return summarize([latency for latency, _ in results], elapsed, errors)
+
+
+def get_sample_kwargs():
+    """Значения параметров URL для прогона и пользователи для входа.
+
+    Берётся самый обсуждаемый видимый пост; страницы поста открывает его
+    автор, страницы комментария — автор комментария.
+    """
+    from .models import Comment, Post
+
+    post = Post.objects.visible().select_related(
+        'author', 'category').annotate(
+        comment_count=Count('comment')).order_by('-comment_count').first()
+    if post is None:
+        return {}, {}
+    comment = Comment.objects.filter(post=post).select_related(
+        'author').order_by('pk').first()
+    sample = {
+        'post_id': post.pk,
+        'slug': post.category.slug,
+        'username': post.author.username,
+    }
+    users = {'post_id': post.author}
+    if comment is not None:
+        sample['comment_id'] = comment.pk
+        users['comment_id'] = comment.author
+    return users, sample
+
+
+def iter_url_cases(namespaces=('blog', 'pages')):
+    """Все именованные URL приложений с подставленными параметрами."""
+    from django.urls import get_resolver, reverse
+
+    users, sample = get_sample_kwargs()
+    for pattern in get_resolver().url_patterns:
+        namespace = getattr(pattern, 'namespace', None)
+        if namespace not in namespaces:
+            continue
+        for url_pattern in pattern.url_patterns:
+            if not url_pattern.name:
+                continue
+            names = url_pattern.pattern.converters.keys()
+            if any(name not in sample for name in names):
+                continue
+            kwargs = {name: sample[name] for name in names}
+            user = users.get('comment_id' if 'comment_id' in names
+                             else 'post_id')
+            yield (f'{namespace}:{url_pattern.name}',
+                   reverse(f'{namespace}:{url_pattern.name}', kwargs=kwargs),
+                   user)
+
+
+def benchmark_url(client, url, repeat):
+    """Задержки, число запросов к БД и пик памяти для одного URL."""
+    client.get(url)  # прогрев кешей и шаблонов
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(url)
+        latencies.append(time.perf_counter() - started)
+    # Журнал запросов очищается в начале каждого запроса (при DEBUG
+    # он не пуст), поэтому обнуляем его заранее.
+    reset_queries()
+    with CaptureQueriesContext(connection) as queries:
+        client.get(url)
+    tracemalloc.start()
+    client.get(url)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'url': url,
+        'status': response.status_code,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'queries': len(queries),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def run_benchmark(repeat=50, anonymous=False):
+    results = {}
+    for name, url, author in iter_url_cases():
+        client = Client()
+        if author is not None and not anonymous:
+            client.force_login(author)
+        results[name] = benchmark_url(client, url, repeat)
+    return results
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from blog.models import Post, make_preview
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = ('Заполняет отрывки и число слов у постов, сохранённых '
+            'до их появления или загруженных в обход модели.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--all', action='store_true', dest='everything',
+                            help='Пересчитать отрывки у всех постов.')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        posts = Post.objects.using(using).order_by('pk')
+        if not options['everything']:
+            posts = posts.filter(preview={})
+        updated = 0
+        last_pk = 0
+        while True:
+            batch = list(posts.filter(pk__gt=last_pk).values_list(
+                'pk', 'text')[:options['batch_size']])
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            changed = [Post(pk=pk, preview=make_preview(text))
+                       for pk, text in batch]
+            # Версию не трогаем: отрывок не правка поста.
+            with transaction.atomic(using=using):
+                Post.objects.using(using).bulk_update(changed, ['preview'])
+            updated += len(changed)
+            if options['verbosity'] >= 2:
+                self.stdout.write(f'Обработано постов: {updated}…')
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено постов: {updated}'))
@@ -0,0 +1,68 @@
+import json
+import subprocess
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from blog.loadtest import run_benchmark
+
+
+def get_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+class Command(BaseCommand):
+    help = ('Прогоняет все URL приложений blog и pages через тестовый клиент '
+            'и сохраняет p50/p99, число запросов к БД и пик памяти.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--anonymous', action='store_true',
+                            help='Ходить без авторизации.')
+        parser.add_argument('--output-dir',
+                            default=str(settings.BASE_DIR / 'benchmarks'))
+        parser.add_argument('--compare', metavar='RESULTS_JSON',
+                            help='Сравнить с сохранёнными результатами.')
+
+    def handle(self, *args, **options):
+        with override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            results = run_benchmark(options['repeat'], options['anonymous'])
+        if not results:
+            raise CommandError('В базе нет данных для прогона; '
+                               'сначала запустите blog_generate_data.')
+        commit = get_commit()
+        report = {
+            'commit': commit,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'repeat': options['repeat'],
+            'results': results,
+        }
+        output_dir = settings.BASE_DIR / options['output_dir']
+        output_dir.mkdir(parents=True, exist_ok=True)
+        path = output_dir / (
+            f'{datetime.now():%Y%m%d-%H%M%S}-{commit}.json')
+        path.write_text(json.dumps(report, ensure_ascii=False, indent=2))
+
+        previous = {}
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as compare_file:
+                previous = json.load(compare_file)['results']
+        for name, item in results.items():
+            line = (f'{name:<22} {item["status"]} '
+                    f'p50 {item["p50_ms"]:>8} мс p99 {item["p99_ms"]:>8} мс '
+                    f'запросов {item["queries"]:>3} '
+                    f'пик {item["peak_kb"]:>8} КБ')
+            if name in previous:
+                old = previous[name]
+                line += (f'  (p50 {item["p50_ms"] - old["p50_ms"]:+.2f}, '
+                         f'запросов {item["queries"] - old["queries"]:+d})')
+            self.stdout.write(line)
+        self.stdout.write(f'Результаты сохранены в {path}')
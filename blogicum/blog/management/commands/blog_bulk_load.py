@@ -0,0 +1,71 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, IntegrityError
+
+from blog.bulk_load import BulkLoadError, bulk_load
+from blog.models import Post
+from blog.reference import bump_version
+
+
+class Command(BaseCommand):
+    help = ('Быстро загружает дамп dumpdata (JSON или JSONL) пачками '
+            'через executemany с отложенными индексами и проверкой FK.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл дампа или «-» для stdin.')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--transaction-size', type=int, default=50000)
+        parser.add_argument(
+            '--on-conflict', choices=('error', 'ignore', 'replace'),
+            default='error',
+            help='Что делать со строками, чей ключ уже есть в БД; '
+                 'replace поддерживается только SQLite.')
+        parser.add_argument(
+            '-e', '--exclude', action='append', default=[],
+            help='Не загружать приложение или модель (app или app.model).')
+        parser.add_argument('--keep-indexes', action='store_true',
+                            help='Не удалять вторичные индексы на время '
+                                 'загрузки.')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        exclude = {label.lower() for label in options['exclude']}
+        started = time.perf_counter()
+        stream = (sys.stdin if options['path'] == '-'
+                  else open(options['path'], encoding='utf-8'))
+        try:
+            counts = bulk_load(
+                stream,
+                using=options['database'],
+                batch_size=options['batch_size'],
+                transaction_size=options['transaction_size'],
+                on_conflict=options['on_conflict'],
+                exclude=exclude,
+                drop_indexes=not options['keep_indexes'],
+                progress=self.report_progress,
+            )
+        except BulkLoadError as error:
+            raise CommandError(str(error))
+        except IntegrityError as error:
+            raise CommandError(
+                f'{error}. Используйте --on-conflict ignore, чтобы '
+                'пропускать уже существующие строки.')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        # Сигналы при вставке не срабатывают — сбрасываем кеш справочников
+        # и пересчитываем видимость постов.
+        bump_version()
+        Post.objects.using(options['database']).sync_visibility()
+        elapsed = time.perf_counter() - started
+        total = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено {total} строк за {elapsed:.2f} с '
+            f'({total / elapsed if elapsed else 0:.0f} строк/с).'))
+
+    def report_progress(self, model, done):
+        if self.verbosity >= 2:
+            self.stdout.write(f'{model._meta.label}: {done}')
@@ -0,0 +1,44 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from blog.deletion import CHUNK_SIZE, delete_user, deletion_summary
+
+
+class Command(BaseCommand):
+    help = ('Удаляет пользователя вместе с постами и комментариями '
+            'пачками прямых DELETE, показывая прогресс.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument('--noinput', '--no-input', action='store_false',
+                            dest='interactive')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        User = get_user_model()
+        try:
+            user = User.objects.using(options['database']).get(
+                username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(
+                f'Пользователь {options["username"]} не найден.')
+        summary = deletion_summary(user=user, using=options['database'])
+        described = ', '.join(
+            f'{name}: {count}' for name, count in summary.items())
+        self.stdout.write(f'Будут удалены {user.username} и {described}.')
+        if options['interactive']:
+            answer = input('Введите «yes», чтобы продолжить: ')
+            if answer != 'yes':
+                raise CommandError('Удаление отменено.')
+        counts = delete_user(user, options['database'],
+                             options['chunk_size'], self.report_progress)
+        self.stdout.write(self.style.SUCCESS(
+            'Удалено: ' + ', '.join(
+                f'{name}={count}' for name, count in counts.items())))
+
+    def report_progress(self, name, deleted):
+        if self.verbosity >= 1:
+            self.stdout.write(f'{name}: {deleted}…')
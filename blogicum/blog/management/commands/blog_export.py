@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from blog.export import EXPORT_MODELS, WRITERS, ExportError, export_corpus
+
+
+def parse_date_option(value):
+    try:
+        parsed = (parse_datetime(value)
+                  or parse_datetime(f'{value}T00:00:00'))
+    except ValueError:
+        # Формат верный, но такой даты нет (например, 30 февраля).
+        parsed = None
+    if parsed is None:
+        raise CommandError(f'Не удалось разобрать дату «{value}».')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+class Command(BaseCommand):
+    help = ('Потоково выгружает посты, комментарии, категории и '
+            'местоположения в JSONL, CSV или Parquet с контрольными точками.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Каталог для файлов выгрузки.')
+        parser.add_argument('--format', choices=sorted(WRITERS),
+                            default='jsonl')
+        parser.add_argument('--models', nargs='+', choices=list(EXPORT_MODELS),
+                            default=list(EXPORT_MODELS))
+        parser.add_argument('--since', help='Начало периода (включительно): '
+                                            'дата публикации поста или '
+                                            'создания записи.')
+        parser.add_argument('--until', help='Конец периода (не включая).')
+        parser.add_argument('--category', help='Slug категории.')
+        parser.add_argument('--author', help='Имя пользователя автора.')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--resume', action='store_true',
+                            help='Продолжить с последней контрольной точки.')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        try:
+            result = export_corpus(
+                options['directory'],
+                options['models'],
+                file_format=options['format'],
+                chunk_size=options['chunk_size'],
+                resume=options['resume'],
+                progress=self.report_progress,
+                since=options['since'] and parse_date_option(
+                    options['since']),
+                until=options['until'] and parse_date_option(
+                    options['until']),
+                category=options['category'],
+                author=options['author'],
+            )
+        except ExportError as error:
+            raise CommandError(str(error))
+        for name, count in result.items():
+            self.stdout.write(f'{name}: {count}')
+
+    def report_progress(self, name, exported):
+        if self.verbosity >= 2:
+            self.stdout.write(f'{name}: {exported}…')
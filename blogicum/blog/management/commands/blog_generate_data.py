@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from blog.reference import bump_version
+from blog.synthetic import SYNTHETIC_PASSWORD, SyntheticDataset
+
+
+class Command(BaseCommand):
+    help = ('Генерирует синтетический набор данных для нагрузочных тестов: '
+            'пользователей, посты, комментарии, категории и местоположения.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=100000)
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--locations', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--unpublished-ratio', type=float, default=0.05)
+        parser.add_argument('--future-ratio', type=float, default=0.03)
+        parser.add_argument('--zipf-exponent', type=float, default=1.1)
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        dataset = SyntheticDataset(
+            users=options['users'],
+            posts=options['posts'],
+            comments=options['comments'],
+            categories=options['categories'],
+            locations=options['locations'],
+            seed=options['seed'],
+            unpublished_ratio=options['unpublished_ratio'],
+            future_ratio=options['future_ratio'],
+            zipf_exponent=options['zipf_exponent'],
+        )
+        counts = dataset.generate(options['database'])
+        bump_version()
+        elapsed = time.perf_counter() - started
+        for label, count in counts.items():
+            self.stdout.write(f'{label}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {elapsed:.2f} с. Пароль пользователей: '
+            f'{SYNTHETIC_PASSWORD}'))
@@ -0,0 +1,88 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from django.urls import reverse
+
+from blog.loadtest import run_asgi, run_wsgi
+from blog.models import Category, Post
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный прогон ленты, категории, профиля и страницы поста '
+            'в режиме WSGI (синхронные view) или ASGI (асинхронные view).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interface', choices=('wsgi', 'asgi'),
+                            default='wsgi')
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--compare', action='store_true',
+                            help='Прогнать оба режима в отдельных процессах '
+                                 'и вывести сравнение.')
+        parser.add_argument('--json', action='store_true',
+                            help='Вывести результат одной строкой JSON.')
+
+    def get_urls(self):
+        post = Post.objects.filter(
+            is_published=True, category__is_published=True
+        ).select_related('author', 'category').order_by('-pub_date').first()
+        if post is None:
+            raise CommandError('В базе нет опубликованных постов.')
+        category = Category.objects.filter(is_published=True).first()
+        return [
+            reverse('blog:index'),
+            reverse('blog:category_posts', args=[category.slug]),
+            reverse('blog:profile', args=[post.author.username]),
+            reverse('blog:post_detail', args=[post.id]),
+        ]
+
+    def run_single(self, options):
+        urls = self.get_urls()
+        runner = run_asgi if options['interface'] == 'asgi' else run_wsgi
+        # Тестовые клиенты ходят с заголовком Host: testserver.
+        with override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            return runner(urls, options['requests'], options['concurrency'])
+
+    def run_subprocess(self, interface, options):
+        env = dict(os.environ,
+                   BLOGICUM_ASYNC_VIEWS='1' if interface == 'asgi' else '0')
+        output = subprocess.run(
+            [sys.executable, str(settings.BASE_DIR / 'manage.py'),
+             'blog_loadtest', '--json', '--interface', interface,
+             '--requests', str(options['requests']),
+             '--concurrency', str(options['concurrency'])],
+            env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        return json.loads(output.strip().splitlines()[-1])
+
+    def handle(self, *args, **options):
+        if not options['compare']:
+            result = self.run_single(options)
+            if options['json']:
+                self.stdout.write(json.dumps(result))
+            else:
+                self.write_result(options['interface'], result)
+            return
+        results = {
+            interface: self.run_subprocess(interface, options)
+            for interface in ('wsgi', 'asgi')
+        }
+        for interface, result in results.items():
+            self.write_result(interface, result)
+        speedup = results['asgi']['rps'] / (results['wsgi']['rps'] or 1)
+        self.stdout.write(f'ASGI/WSGI по пропускной способности: '
+                          f'{speedup:.2f}x')
+
+    def write_result(self, interface, result):
+        self.stdout.write(
+            f'{interface.upper()}: {result["requests"]} запросов '
+            f'за {result["elapsed_s"]} с, {result["rps"]} rps, '
+            f'p50 {result["p50_ms"]} мс, p99 {result["p99_ms"]} мс, '
+            f'ошибок {result["errors"]}'
+        )
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from blog import publishing
+from blog.models import Category, Location
+
+MODELS = {'category': Category, 'location': Location}
+
+
+class Command(BaseCommand):
+    help = ('Публикует или снимает с публикации категории и местоположения; '
+            'видимость постов пересчитывается пачками.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=sorted(MODELS))
+        parser.add_argument('ids', nargs='+', type=int)
+        parser.add_argument('--unpublish', action='store_true')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--wait', action='store_true',
+                            help='Пересчитать посты сразу, показывая '
+                                 'прогресс, а не в фоновой задаче.')
+
+    def handle(self, *args, **options):
+        model = MODELS[options['model']]
+        found = set(model.objects.using(options['database']).filter(
+            pk__in=options['ids']).values_list('pk', flat=True))
+        missing = sorted(set(options['ids']) - found)
+        if missing:
+            raise CommandError(
+                f'Не найдены записи: {", ".join(map(str, missing))}.')
+        updated, job_id = publishing.set_published(
+            model, options['ids'], not options['unpublish'],
+            options['database'], background=not options['wait'])
+        self.stdout.write(f'Изменено записей: {updated}.')
+        if job_id is None:
+            return
+        if not options['wait']:
+            self.stdout.write(f'Пересчёт постов поставлен в очередь: {job_id}')
+            return
+        category_ids = publishing.get_progress(job_id)['category_ids']
+        changed = publishing.propagate(
+            job_id, category_ids, options['database'],
+            progress=self.report_progress)
+        self.stdout.write(self.style.SUCCESS(
+            f'Изменена видимость постов: {changed}'))
+
+    def report_progress(self, done, total):
+        self.stdout.write(f'Постов: {done} из {total}…')
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, close_old_connections
+
+from blog.counts import invalidate_all
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает видимость постов: открывает отложенные, чья '
+            'дата наступила, и исправляет расхождения после правок в '
+            'обход save(). Запускайте по расписанию или с --interval.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Повторять каждые столько секунд.')
+
+    def handle(self, *args, **options):
+        while True:
+            changed = Post.objects.using(
+                options['database']).sync_visibility()
+            if changed:
+                invalidate_all()
+            if options['verbosity'] >= 1:
+                self.stdout.write(f'Изменена видимость постов: {changed}')
+            if not options['interval']:
+                return
+            close_old_connections()
+            time.sleep(options['interval'])
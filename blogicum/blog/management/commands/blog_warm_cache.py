@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.warmup import warm
+
+
+class Command(BaseCommand):
+    help = ('Прогревает кеши после выкладки: первые страницы ленты, '
+            'страницы опубликованных категорий, самые обсуждаемые посты '
+            'и шаблоны.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=3,
+                            help='Сколько первых страниц ленты прогреть.')
+        parser.add_argument('--posts', type=int, default=20,
+                            help='Сколько страниц постов прогреть.')
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--no-templates', action='store_false',
+                            dest='templates')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        results = warm(options['pages'], options['posts'],
+                       options['concurrency'], options['templates'])
+        failed = 0
+        for result in results:
+            line = (f'{result["target"]}: {result["status"]}, '
+                    f'{result["elapsed_ms"]} мс')
+            if result['status'] in ('ok', 200):
+                if options['verbosity'] >= 1:
+                    self.stdout.write(line)
+            else:
+                failed += 1
+                self.stderr.write(line)
+        if options['verbosity'] >= 1:
+            self.stdout.write(
+                f'Прогрето целей: {len(results) - failed} '
+                f'из {len(results)} за '
+                f'{time.perf_counter() - started:.2f} с')
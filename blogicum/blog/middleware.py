@@ -0,0 +1,34 @@
+import logging
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.deprecation import MiddlewareMixin
+
+from .loaders import get_loaders
+
+logger = logging.getLogger('blog.identity')
+
+
+class IdentityMapMiddleware(MiddlewareMixin):
+    """Создаёт identity map запроса и отчитывается о её эффективности."""
+
+    def process_request(self, request):
+        loaders = get_loaders(request)
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            # Текущий пользователь нужен шапке; если он же автор поста
+            # или комментария, повторно его не загружаем.
+            loaders.for_model(get_user_model()).prime(user)
+
+    def process_response(self, request, response):
+        loaders = getattr(request, '_blog_loaders', None)
+        if loaders is None or not loaders.loaders:
+            return response
+        stats = loaders.stats()
+        logger.debug('Identity map for %s: %s', request.path, stats)
+        if settings.DEBUG:
+            response['X-Identity-Map'] = '; '.join(
+                f'{name} hits={item["hits"]} misses={item["misses"]}'
+                for name, item in stats.items()
+            )
+        return response
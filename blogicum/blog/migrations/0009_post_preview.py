@@ -0,0 +1,47 @@
+# Generated by Django 3.2.16 on 2026-10-19 09:28
+
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+BATCH_SIZE = 1000
+
+
+def make_preview(text):
+    # Копия blog.models.make_preview на момент миграции: миграция не
+    # должна зависеть от того, как превью строится в будущем.
+    excerpt = Truncator(text).words(10, truncate=' …')
+    return {
+        'excerpt': Truncator(excerpt).chars(512),
+        'word_count': len(text.split()),
+    }
+
+
+def fill_preview(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    posts = Post.objects.using(
+        schema_editor.connection.alias).order_by('pk')
+    last_pk = 0
+    while True:
+        batch = list(posts.filter(pk__gt=last_pk).values_list(
+            'pk', 'text')[:BATCH_SIZE])
+        if not batch:
+            return
+        last_pk = batch[-1][0]
+        posts.bulk_update([Post(pk=pk, preview=make_preview(text))
+                           for pk, text in batch], ['preview'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_post_comment_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='preview',
+            field=models.JSONField(default=dict, editable=False, verbose_name='Превью'),
+        ),
+        migrations.RunPython(fill_preview, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,68 @@
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth import get_user_model
+from django.utils import timezone
+from django.utils.text import Truncator
 
 
 User = get_user_model()
 
+# Сколько слов текста показывать в карточке поста.
+EXCERPT_WORDS = 10
+EXCERPT_LENGTH = 512
+
+
+def make_preview(text):
+    """Отрывок как у ``truncatewords:10`` и число слов текста."""
+    excerpt = Truncator(text).words(EXCERPT_WORDS, truncate=' …')
+    return {
+        'excerpt': Truncator(excerpt).chars(EXCERPT_LENGTH),
+        'word_count': len(text.split()),
+    }
+
+
+class VersionConflict(Exception):
+    """Запись изменили после того, как её загрузили для редактирования."""
+
+
+class VersionedModel(models.Model):
+    """Оптимистическая блокировка: UPDATE сравнивает и увеличивает версию.
+
+    Сохранение существующей записи меняет строку, только если её версия
+    в базе совпадает с ``self.version``; иначе — ``VersionConflict``.
+    """
+
+    version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Версия')
+
+    class Meta:
+        abstract = True
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields,
+                   forced_update):
+        if not values:
+            return super()._do_update(base_qs, using, pk_val, values,
+                                      update_fields, forced_update)
+        version_field = self._meta.get_field('version')
+        values = [item for item in values if item[0] is not version_field]
+        values.append((version_field, None, self.version + 1))
+        updated = super()._do_update(
+            base_qs.filter(version=self.version), using, pk_val, values,
+            update_fields, forced_update)
+        if updated:
+            self.version += 1
+        elif base_qs.filter(pk=pk_val).exists():
+            raise VersionConflict(
+                f'{self._meta.verbose_name} {pk_val} уже изменена.')
+        return updated
+
+    def save(self, *args, update_fields=None, **kwargs):
+        if update_fields:
+            update_fields = {*update_fields, 'version'}
+        super().save(*args, update_fields=update_fields, **kwargs)
+
 
 class Category(models.Model):
     title = models.CharField(
@@ -58,7 +117,79 @@ class Location(models.Model):
         return self.name
 
 
-class Post(models.Model):
+# Поля, от которых зависит видимость поста.
+VISIBILITY_FIELDS = frozenset({
+    'is_published', 'pub_date', 'category', 'category_id'})
+
+
+def set_visibility(posts, now=None):
+    """Вычисляет ``is_visible`` постов одним запросом к категориям."""
+    now = now or timezone.now()
+    unknown = {post.category_id for post in posts
+               if not Post.category.is_cached(post)}
+    published = set(Category.objects.filter(
+        pk__in=unknown, is_published=True).values_list('pk', flat=True))
+    for post in posts:
+        if Post.category.is_cached(post):
+            category_published = (post.category is not None
+                                  and post.category.is_published)
+        else:
+            category_published = post.category_id in published
+        post.is_visible = bool(post.is_published and category_published
+                               and post.pub_date <= now)
+
+
+def visibility_condition(now=None, check_published=True):
+    """Условие видимости поста без соединения с таблицей категорий.
+
+    ``check_published=False`` — для UPDATE, который сам выставляет
+    ``is_published``: в SET видны ещё прежние значения строки.
+    """
+    condition = Q(pub_date__lte=now or timezone.now(),
+                  category_id__in=Category.objects.filter(
+                      is_published=True).values('pk'))
+    if check_published:
+        condition &= Q(is_published=True)
+    return condition
+
+
+class PostQuerySet(models.QuerySet):
+    def visible(self, now=None):
+        """Посты, которые видят все: опубликованные к этому моменту.
+
+        Снятие категории с публикации доходит до ``is_visible`` постов
+        фоновыми пачками; до тех пор такие посты отсекает список скрытых
+        категорий из кеша справочников.
+        """
+        from .reference import hidden_category_ids
+
+        posts = self.filter(is_visible=True,
+                            pub_date__lte=now or timezone.now())
+        hidden = hidden_category_ids()
+        if hidden:
+            posts = posts.exclude(category_id__in=hidden)
+        return posts
+
+    def sync_visibility(self, now=None):
+        """Исправляет ``is_visible`` у постов выборки двумя UPDATE.
+
+        Нужен после правок в обход ``save()``: смены публикации категории,
+        прямых UPDATE, загрузки дампов, наступления отложенных дат.
+        """
+        should_be_visible = visibility_condition(now)
+        hidden = self.filter(is_visible=True).exclude(
+            should_be_visible).update(is_visible=False)
+        shown = self.filter(should_be_visible, is_visible=False).update(
+            is_visible=True)
+        return hidden + shown
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        set_visibility(objs)
+        return super().bulk_create(objs, *args, **kwargs)
+
+
+class Post(VersionedModel):
     title = models.CharField(
         max_length=256,
         blank=False,
@@ -68,6 +199,7 @@ class Post(models.Model):
         verbose_name='Текст')
     pub_date = models.DateTimeField(
         blank=False,
+        db_index=True,
         verbose_name='Дата и время публикации',
         help_text='Если установить дату и время в будущем — '
         'можно делать отложенные публикации.')
@@ -99,20 +231,59 @@ class Post(models.Model):
         verbose_name='Добавлено',
         auto_now_add=True)
     image = models.ImageField('Фото', upload_to='posts_images', blank=True)
+    # Отрывок и число слов для карточки в ленте: лента не читает text.
+    preview = models.JSONField(
+        default=dict,
+        editable=False,
+        verbose_name='Превью')
+    # Опубликован, дата наступила и категория опубликована: ленты
+    # фильтруют по одному полю без соединения с категориями.
+    is_visible = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name='Виден всем')
+
+    objects = PostQuerySet.as_manager()
 
     @property
     def username(self):
         return self.author.username
 
+    def is_visible_to(self, user, now=None):
+        """То же условие, что ``Post.objects.visible()``, плюс автор."""
+        from .reference import hidden_category_ids
+
+        if user.is_authenticated and user.pk == self.author_id:
+            return True
+        return (self.is_visible and self.pub_date <= (now or timezone.now())
+                and self.category_id not in hidden_category_ids())
+
+    def save(self, *args, update_fields=None, **kwargs):
+        if update_fields is None or 'text' in update_fields:
+            self.preview = make_preview(self.text)
+            if update_fields is not None:
+                update_fields = {*update_fields, 'preview'}
+        if update_fields is None or VISIBILITY_FIELDS & set(update_fields):
+            set_visibility([self])
+            if update_fields is not None:
+                update_fields = {*update_fields, 'is_visible'}
+        super().save(*args, update_fields=update_fields, **kwargs)
+
     class Meta:
         verbose_name = 'публикация'
         verbose_name_plural = 'Публикации'
+        indexes = [
+            models.Index(fields=['is_visible', 'pub_date'],
+                         name='post_visible_date_idx'),
+            models.Index(fields=['category', 'is_visible', 'pub_date'],
+                         name='post_category_visible_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
 
-class Comment(models.Model):
+class Comment(VersionedModel):
     text = models.TextField(
         blank=False,
         verbose_name='Текст')
@@ -136,6 +307,11 @@ class Comment(models.Model):
     class Meta:
         verbose_name = 'комментарий'
         verbose_name_plural = 'Комментарии'
+        ordering = ('created_at', 'id')
+        indexes = [
+            models.Index(fields=['post', 'created_at'],
+                         name='comment_post_created_idx'),
+        ]
 
     def __str__(self):
         return self.text
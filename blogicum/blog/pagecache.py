@@ -0,0 +1,99 @@
+"""Кеш страниц целиком с «дырами» под данные пользователя.
+
+Ленты и страница поста у всех посетителей одинаковы, кроме мелочей:
+кнопки входа или имени в шапке, формы комментария с CSRF-токеном,
+ссылок на правку своих постов и комментариев. Из-за них страницу
+нельзя закешировать для вошедших пользователей.
+
+Такие места в шаблонах обёрнуты тегом ``{% hole "шаблон" %}``
+(``page_holes``). Общая часть страницы рендерится один раз от имени
+анонима: вместо дыр в неё попадают метки с именем шаблона и его
+параметрами. На каждом запросе метки заменяются результатом рендера
+маленьких шаблонов дыр с настоящим пользователем. Вне этого режима тег
+просто подключает шаблон, как ``include``.
+
+Общая часть хранится через ``cachelayer`` (пересчитывает один процесс)
+под ключом из адреса страницы и версий данных, от которых она зависит;
+сброс версий делает старые записи недостижимыми.
+"""
+import hashlib
+import json
+import re
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.template.loader import get_template, render_to_string
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+from django.utils.safestring import mark_safe
+
+from . import counts, reference, rendering
+from .cachelayer import get_or_set
+from .hotcache import post_detail_cache
+
+# Переменная контекста, включающая вывод меток вместо дыр.
+HOLES_VARIABLE = 'page_holes'
+FEEDS_VERSION_KEY = 'blog:page:feeds:version'
+PLACEHOLDER = re.compile(r'<!--blog:hole:([\w./-]+):([\w-]*)-->')
+
+
+def placeholder(template_name, params):
+    encoded = urlsafe_base64_encode(json.dumps(params).encode())
+    return mark_safe(f'<!--blog:hole:{template_name}:{encoded}-->')
+
+
+def render_shared(request, template_name, context):
+    """Общая часть страницы: без пользователя и CSRF-токена."""
+    return render_to_string(template_name, {
+        **context,
+        'user': AnonymousUser(),
+        'csrf_token': '',
+        HOLES_VARIABLE: True,
+    }, request)
+
+
+def fill_holes(body, request, context):
+    """Подставляет в общую часть дыры, отрендеренные для запроса."""
+    fragments = {}
+    templates = {}
+
+    def render(match):
+        if match[0] not in fragments:
+            if match[1] not in templates:
+                templates[match[1]] = get_template(match[1])
+            params = json.loads(urlsafe_base64_decode(match[2]))
+            fragments[match[0]] = templates[match[1]].render(
+                {**context, **params}, request)
+        return fragments[match[0]]
+
+    return PLACEHOLDER.sub(render, body)
+
+
+def page_key(request, versions):
+    digest = hashlib.md5(
+        f'{request.get_full_path()}|{versions}'.encode()).hexdigest()
+    return f'blog:page:{digest}'
+
+
+def get_or_render(key, render):
+    return get_or_set(key, render, settings.PAGE_CACHE_TTL,
+                      background=False)
+
+
+def feed_versions():
+    """Версии, от которых зависят страницы лент."""
+    versions = cache.get_many([FEEDS_VERSION_KEY, counts.VERSION_KEY])
+    return (versions.get(FEEDS_VERSION_KEY, 0),
+            versions.get(counts.VERSION_KEY, 0),
+            reference.get_version())
+
+
+def post_versions(post_id):
+    """Версии, от которых зависит страница поста."""
+    return (post_detail_cache.get_version(post_id), reference.get_version(),
+            rendering.RENDERER_VERSION)
+
+
+def invalidate_feeds():
+    cache.set(FEEDS_VERSION_KEY, time.time_ns(), None)
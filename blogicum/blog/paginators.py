@@ -0,0 +1,133 @@
+from django.conf import settings
+from django.core.exceptions import BadRequest
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+# Ниже этого порога оценка уточняется точным COUNT(*).
+EXACT_COUNT_THRESHOLD = 10000
+
+
+def estimate_table_rows(model, using='default'):
+    """Оценка числа строк таблицы из статистики планировщика PostgreSQL.
+
+    На других СУБД надёжной дешёвой оценки нет (разброс первичного ключа
+    завышен удалёнными строками и даёт несуществующие страницы),
+    поэтому возвращается None.
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+            [model._meta.db_table])
+        row = cursor.fetchone()
+    if row and row[0] > 0:
+        return row[0]
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор, который не считает строки таблицы целиком.
+
+    Для нефильтрованного списка на PostgreSQL берётся оценка размера
+    таблицы; точный COUNT(*) выполняется для небольших таблиц, для списков
+    с фильтрами, поиском или выбранной датой и на остальных СУБД.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if getattr(queryset, 'query', None) is None or queryset.query.where:
+            return super().count
+        estimate = estimate_table_rows(queryset.model, queryset.db)
+        if estimate is None or estimate < EXACT_COUNT_THRESHOLD:
+            return super().count
+        return estimate
+
+
+class PageTooDeep(Exception):
+    """Запрошена страница глубже MAX_PAGE_DEPTH; ``url`` — куда перейти."""
+
+    def __init__(self, url):
+        super().__init__(url)
+        self.url = url
+
+
+def get_page_number(request):
+    try:
+        return max(int(request.GET.get('page', 1)), 1)
+    except (TypeError, ValueError):
+        return 1
+
+
+def get_before(request):
+    try:
+        before = parse_datetime(request.GET.get('before') or '')
+    except ValueError:
+        # Формат верный, но такой даты нет (например, 30 февраля).
+        raise BadRequest('Некорректная дата в параметре before.')
+    if before is not None and timezone.is_naive(before):
+        before = timezone.make_aware(before)
+    return before
+
+
+def filter_before(posts, request):
+    """Навигация по датам: только посты, опубликованные раньше ?before=."""
+    before = get_before(request)
+    if before is None:
+        return posts
+    return posts.filter(pub_date__lt=before)
+
+
+def get_query_prefix(request, **params):
+    query = request.GET.copy()
+    query.pop('page', None)
+    for name, value in params.items():
+        query[name] = value
+    return query.urlencode() + '&' if query else ''
+
+
+def check_page_depth(posts, request, per_page):
+    """Не даёт листать глубже MAX_PAGE_DEPTH страниц через OFFSET.
+
+    Вместо этого перенаправляет на ``?before=`` — дату последнего поста
+    на странице MAX_PAGE_DEPTH; поиск этой даты ограничен глубиной.
+    Посты должны быть отсортированы по убыванию pub_date.
+    """
+    depth = settings.MAX_PAGE_DEPTH
+    if not depth or get_page_number(request) <= depth:
+        return
+    boundary = posts.values_list('pub_date', flat=True)[
+        depth * per_page - 1:depth * per_page]
+    boundary = list(boundary)
+    if boundary:
+        prefix = get_query_prefix(request, before=boundary[0].isoformat())
+        raise PageTooDeep(f'{request.path}?{prefix.rstrip("&")}')
+
+
+def add_page_links(page, request, on_each_side=2, on_ends=1):
+    """Сокращённый список страниц для includes/paginator.html.
+
+    Вместо ссылки на каждую страницу — окно вокруг текущей, первая и
+    последние страницы; страницы глубже MAX_PAGE_DEPTH заменяет ссылка
+    «Ранее» на навигацию по дате.
+    """
+    paginator = page.paginator
+    depth = settings.MAX_PAGE_DEPTH or paginator.num_pages
+    page.page_links = [
+        number for number in paginator.get_elided_page_range(
+            page.number, on_each_side=on_each_side, on_ends=on_ends)
+        if number == paginator.ELLIPSIS or number <= depth
+    ]
+    page.query_prefix = get_query_prefix(request)
+    page.show_last = paginator.num_pages <= depth
+    page.older_query = None
+    posts = list(page.object_list)
+    if not page.show_last and posts:
+        page.older_query = get_query_prefix(
+            request, before=posts[-1].pub_date.isoformat())
+    return page
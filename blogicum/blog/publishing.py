@@ -0,0 +1,129 @@
+"""Публикация и снятие с публикации категорий и местоположений.
+
+Флаг самого справочника меняется сразу одним UPDATE. От публикации
+категории зависит ``Post.is_visible``; у большой категории это сотни
+тысяч строк, поэтому посты пересчитываются фоновой задачей пачками по
+``PUBLISH_CHUNK_SIZE`` в коротких транзакциях, не держа долгую блокировку
+таблицы постов. Снятие с публикации в лентах видно сразу: ``visible()``
+отсекает скрытые категории по кешу справочников.
+
+Прогресс пересчёта хранится в кеше Django: по номеру задания
+(``get_progress``) и по категории (``get_category_progress``).
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .counts import invalidate_all
+from .deletion import iter_pk_chunks
+from .models import Category, Location, Post
+from .reference import bump_version
+
+PROGRESS_TIMEOUT = 60 * 60 * 24
+
+
+def progress_key(job_id):
+    return f'blog:publishing:job:{job_id}'
+
+
+def category_key(category_id):
+    return f'blog:publishing:category:{category_id}'
+
+
+def set_published(model, ids, is_published, using=DEFAULT_DB_ALIAS,
+                  background=True):
+    """Меняет флаг публикации категорий или местоположений.
+
+    Возвращает число изменённых записей и номер задания пересчёта
+    постов (None, если пересчитывать нечего). С ``background=False``
+    задание не ставится в очередь: ``propagate`` вызывает сам вызывающий.
+    """
+    if model not in (Category, Location):
+        raise ValueError(f'{model.__name__} не справочник.')
+    changed = list(model.objects.using(using).filter(pk__in=ids).exclude(
+        is_published=is_published).values_list('pk', flat=True))
+    if not changed:
+        return 0, None
+    model.objects.using(using).filter(pk__in=changed).update(
+        is_published=is_published)
+    bump_version()
+    job_id = None
+    if model is Category:
+        job_id = schedule_propagation(changed, using, background)
+    return len(changed), job_id
+
+
+def schedule_propagation(category_ids, using=DEFAULT_DB_ALIAS,
+                         background=True):
+    """Заводит задание пересчёта видимости постов категорий.
+
+    Возвращает номер задания; с ``background=True`` задание сразу
+    ставится в очередь фоновых задач.
+    """
+    from .tasks import propagate_visibility
+
+    job_id = uuid.uuid4().hex
+    total = Post.objects.using(using).filter(
+        category_id__in=category_ids).count()
+    save_progress(job_id, category_ids, done=0, total=total)
+    if background:
+        propagate_visibility.delay(job_id, list(category_ids), using)
+    return job_id
+
+
+def save_progress(job_id, category_ids, **progress):
+    entry = {'category_ids': list(category_ids), 'finished': False,
+             **progress}
+    cache.set_many({
+        progress_key(job_id): entry,
+        **{category_key(pk): job_id for pk in category_ids},
+    }, PROGRESS_TIMEOUT)
+
+
+def get_progress(job_id):
+    """Словарь с ключами done, total, finished или None."""
+    return cache.get(progress_key(job_id))
+
+
+def get_category_progress(category_ids):
+    """Прогресс незавершённых пересчётов по id категорий."""
+    job_ids = cache.get_many([category_key(pk) for pk in category_ids])
+    jobs = cache.get_many([progress_key(job_id)
+                           for job_id in set(job_ids.values())])
+    result = {}
+    for pk in category_ids:
+        job_id = job_ids.get(category_key(pk))
+        entry = jobs.get(progress_key(job_id)) if job_id else None
+        if entry is not None and not entry['finished']:
+            result[pk] = entry
+    return result
+
+
+def propagate(job_id, category_ids, using=DEFAULT_DB_ALIAS,
+              chunk_size=None, progress=None):
+    """Пересчитывает ``is_visible`` постов категорий пачками по pk.
+
+    Повторный запуск безопасен: пачки, уже приведённые в порядок,
+    ничего не меняют. Возвращает число постов, чья видимость изменилась.
+    """
+    chunk_size = chunk_size or settings.PUBLISH_CHUNK_SIZE
+    posts = Post.objects.using(using).filter(category_id__in=category_ids)
+    entry = get_progress(job_id) or {}
+    total = entry.get('total') or posts.count()
+    done = changed = 0
+    for chunk in iter_pk_chunks(posts, chunk_size):
+        with transaction.atomic(using=using):
+            changed += Post.objects.using(using).filter(
+                pk__in=chunk).sync_visibility()
+        done += len(chunk)
+        save_progress(job_id, category_ids, done=done,
+                      total=max(total, done))
+        if progress is not None:
+            progress(done, total)
+    save_progress(job_id, category_ids, done=done, total=done,
+                  finished=True)
+    if changed:
+        invalidate_all()
+    return changed
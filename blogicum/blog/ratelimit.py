@@ -0,0 +1,135 @@
+"""Ограничение частоты создания постов и комментариев (token bucket).
+
+У каждого пользователя (у анонимного — у IP-адреса) есть «ведро» из
+``capacity`` жетонов, которое равномерно наполняется за ``period``
+секунд. Каждый POST забирает жетон; если жетонов нет, запрос получает
+ответ 429 ещё до формы и обращений к базе.
+
+Состояние хранится в кеше Django, чтобы лимит был общим для всех
+процессов. Если кеш недоступен, используется словарь в памяти процесса.
+Чтение и запись в кеш не атомарны: при одновременных запросах одного
+пользователя лимит может быть превышен на несколько запросов.
+"""
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+logger = logging.getLogger('blog.ratelimit')
+
+KEY_PREFIX = 'blog:ratelimit'
+
+
+class LocalStore:
+    """Запасное хранилище в памяти процесса с вытеснением старых ключей."""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.data = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            return self.data.get(key)
+
+    def set(self, key, value, timeout):
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            while len(self.data) > self.max_entries:
+                self.data.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+local_store = LocalStore()
+
+
+class TokenBucket:
+    def __init__(self, capacity, period):
+        self.capacity = capacity
+        self.period = period
+        self.rate = capacity / period
+
+    def take(self, state, now):
+        """Возвращает (разрешено, новое состояние, секунд до жетона)."""
+        tokens, updated = state or (self.capacity, now)
+        tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+        if tokens >= 1:
+            return True, (tokens - 1, now), 0
+        return False, (tokens, now), (1 - tokens) / self.rate
+
+
+class RateLimiter:
+    def __init__(self, scope, capacity, period, cache_alias='default'):
+        self.scope = scope
+        self.bucket = TokenBucket(capacity, period)
+        self.cache_alias = cache_alias
+
+    def hit(self, identity, now=None):
+        """Забирает жетон; возвращает (разрешено, секунд до жетона)."""
+        now = time.time() if now is None else now
+        key = f'{KEY_PREFIX}:{self.scope}:{identity}'
+        # Полное ведро равносильно отсутствию записи.
+        timeout = math.ceil(self.bucket.period)
+        try:
+            store = caches[self.cache_alias]
+            state = store.get(key)
+        except Exception:
+            logger.warning('Кеш лимитов недоступен, считаем в памяти',
+                           exc_info=True)
+            store = local_store
+            state = store.get(key)
+        allowed, state, retry_after = self.bucket.take(state, now)
+        try:
+            store.set(key, state, timeout)
+        except Exception:
+            local_store.set(key, state, timeout)
+        return allowed, retry_after
+
+
+def get_limiter(scope):
+    """Лимитер для scope из настройки RATE_LIMITS или None."""
+    limit = getattr(settings, 'RATE_LIMITS', {}).get(scope)
+    if limit is None:
+        return None
+    capacity, period = limit
+    return RateLimiter(scope, capacity, period,
+                       getattr(settings, 'RATE_LIMIT_CACHE', 'default'))
+
+
+def get_identity(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'user:{user.pk}'
+    return f'ip:{request.META.get("REMOTE_ADDR", "")}'
+
+
+def too_many_requests(retry_after):
+    response = HttpResponse(
+        'Слишком много запросов, попробуйте позже.',
+        status=429, content_type='text/plain; charset=utf-8')
+    response['Retry-After'] = str(math.ceil(retry_after))
+    return response
+
+
+class RateLimitMixin:
+    """Отвечает 429 на POST сверх лимита ``rate_limit_scope``."""
+
+    rate_limit_scope = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method == 'POST':
+            limiter = get_limiter(self.rate_limit_scope)
+            if limiter is not None:
+                allowed, retry_after = limiter.hit(get_identity(request))
+                if not allowed:
+                    return too_many_requests(retry_after)
+        return super().dispatch(request, *args, **kwargs)
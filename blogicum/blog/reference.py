@@ -0,0 +1,96 @@
+"""Кеш справочников (категорий и местоположений) в памяти процесса.
+
+Таблицы маленькие и меняются редко, а нужны почти в каждом запросе.
+Каждый рабочий процесс держит их целиком в памяти и перечитывает только
+при смене номера версии в общем кеше Django. Номер меняется сигналами
+при любом сохранении или удалении категории или местоположения.
+
+Для нескольких процессов ``CACHES['default']`` должен быть общим
+(memcached, redis): с locmem каждый процесс видит только свои правки.
+Объекты из кеша общие для всех запросов процесса — их нельзя изменять.
+"""
+import threading
+import time
+
+from django.core.cache import cache
+
+from .models import Category, Location
+
+VERSION_KEY = 'blog:reference:version'
+
+
+def get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = time.time_ns()
+        # add() не перезапишет номер, выставленный другим процессом.
+        cache.add(VERSION_KEY, version, None)
+        version = cache.get(VERSION_KEY, version)
+    return version
+
+
+def bump_version(**kwargs):
+    """Обработчик сигналов: помечает справочники устаревшими."""
+    cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+class ReferenceCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.tables = {Category: {}, Location: {}}
+        self.published_category_ids = frozenset()
+        self.hidden_category_ids = frozenset()
+        self.categories_by_slug = {}
+
+    def refresh(self):
+        version = get_version()
+        if version == self.version:
+            return
+        with self.lock:
+            if version == self.version:
+                return
+            tables = {
+                model: model.objects.in_bulk()
+                for model in self.tables
+            }
+            self.tables = tables
+            self.published_category_ids = frozenset(
+                pk for pk, category in tables[Category].items()
+                if category.is_published
+            )
+            self.hidden_category_ids = frozenset(
+                tables[Category]) - self.published_category_ids
+            self.categories_by_slug = {
+                category.slug: category
+                for category in tables[Category].values()
+            }
+            self.version = version
+
+    def get_many(self, model, keys):
+        self.refresh()
+        table = self.tables[model]
+        return {key: table[key] for key in keys if key in table}
+
+    def get_category_by_slug(self, slug):
+        self.refresh()
+        return self.categories_by_slug.get(slug)
+
+
+reference_cache = ReferenceCache()
+
+
+def published_category_ids():
+    """Множество id опубликованных категорий для фильтрации ленты."""
+    reference_cache.refresh()
+    return reference_cache.published_category_ids
+
+
+def hidden_category_ids():
+    """Множество id снятых с публикации категорий."""
+    reference_cache.refresh()
+    return reference_cache.hidden_category_ids
+
+
+def get_category_by_slug(slug):
+    return reference_cache.get_category_by_slug(slug)
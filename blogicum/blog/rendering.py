@@ -0,0 +1,81 @@
+"""Готовый HTML текста постов и комментариев.
+
+``linebreaksbr`` экранирует текст и расставляет переносы на каждом
+показе; для длинного поста и большой ветки комментариев это заметная
+доля времени ответа. Здесь HTML считается один раз — при сохранении
+или при первом показе — и хранится в кеше Django.
+
+Ключ — хеш текста: правка меняет ключ, и старый HTML не показывается,
+даже если текст изменили прямым UPDATE. Запись хранит номер
+рендерера: если ``RENDERER_VERSION`` увеличили, старый HTML ещё
+показывается, а фоновая задача пересчитывает его новым рендерером.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.defaultfilters import linebreaksbr
+from django.utils.safestring import mark_safe
+
+# Увеличьте при любом изменении render_text.
+RENDERER_VERSION = 1
+
+
+def render_text(text):
+    return str(linebreaksbr(text, autoescape=True))
+
+
+def html_key(text):
+    return 'blog:html:' + hashlib.md5(text.encode()).hexdigest()
+
+
+def store_html(texts):
+    entries = {
+        html_key(text): (RENDERER_VERSION, render_text(text))
+        for text in texts
+    }
+    cache.set_many(entries, settings.RENDERED_HTML_TTL)
+    return entries
+
+
+def attach_html(objects):
+    """Проставляет ``text_html`` одним обращением к кешу.
+
+    Недостающий HTML считается сразу, устаревший по версии рендерера
+    отдаётся как есть и ставится в фоновый пересчёт.
+    """
+    objects = [obj for obj in objects if obj is not None]
+    keys = [html_key(obj.text) for obj in objects]
+    entries = cache.get_many(set(keys))
+    missing = {obj.text for obj, key in zip(objects, keys)
+               if key not in entries}
+    if missing:
+        entries.update(store_html(missing))
+    stale = [obj for obj, key in zip(objects, keys)
+             if entries[key][0] != RENDERER_VERSION and obj.pk is not None]
+    if stale:
+        schedule_rerender(stale)
+    for obj, key in zip(objects, keys):
+        obj.text_html = mark_safe(entries[key][1])
+    return objects
+
+
+def schedule_rerender(objects):
+    """Ставит пересчёт в очередь; уже поставленные тексты пропускает."""
+    from .tasks import rerender_html
+
+    markers = {
+        f'{html_key(obj.text)}:rerender:{RENDERER_VERSION}': obj
+        for obj in objects
+    }
+    queued = cache.get_many(list(markers))
+    by_model = {}
+    for marker, obj in markers.items():
+        if marker not in queued:
+            by_model.setdefault(obj._meta.label, []).append(obj.pk)
+    if not by_model:
+        return
+    cache.set_many(dict.fromkeys(markers, True),
+                   settings.RENDERED_HTML_TTL)
+    for label, pks in by_model.items():
+        rerender_html.delay(label, pks)
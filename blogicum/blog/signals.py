@@ -0,0 +1,162 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.utils import timezone
+
+from .counts import invalidate_post
+from .hotcache import invalidate_post_detail
+from .pagecache import invalidate_feeds
+from .models import VISIBILITY_FIELDS, Category, Comment, Location, Post
+from .reference import bump_version
+from .publishing import schedule_propagation
+from .rendering import store_html
+from .tasks import refresh_visibility
+
+for model in (Category, Location):
+    post_save.connect(bump_version, sender=model,
+                      dispatch_uid=f'blog_reference_{model.__name__}_save')
+    post_delete.connect(bump_version, sender=model,
+                        dispatch_uid=f'blog_reference_{model.__name__}_delete')
+
+
+SCOPE_FIELDS = frozenset({'category', 'category_id', 'author', 'author_id'})
+
+
+def remember_post_scopes(sender, instance, update_fields=None, **kwargs):
+    """Запоминает прежние категорию, автора и дату публикации.
+
+    Категорию и автора — чтобы сбросить и их счётчики, дату — чтобы
+    не планировать пересчёт видимости, если она не менялась.
+    """
+    instance._previous_scopes = instance._previous_schedule = None
+    if instance.pk is None:
+        return
+    fields = set(update_fields or ())
+    if update_fields is not None and not (
+            SCOPE_FIELDS | VISIBILITY_FIELDS) & fields:
+        return
+    previous = Post.objects.filter(pk=instance.pk).values_list(
+        'category_id', 'author_id', 'pub_date', 'is_published').first()
+    if previous is None:
+        return
+    if update_fields is None or SCOPE_FIELDS & fields:
+        instance._previous_scopes = previous[:2]
+    instance._previous_schedule = previous[2:]
+
+
+def invalidate_post_counts(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_scopes', None) or (None, None)
+    invalidate_post(instance, *previous)
+
+
+pre_save.connect(remember_post_scopes, sender=Post,
+                 dispatch_uid='blog_counts_post_pre_save')
+post_save.connect(invalidate_post_counts, sender=Post,
+                  dispatch_uid='blog_counts_post_save')
+post_delete.connect(invalidate_post_counts, sender=Post,
+                    dispatch_uid='blog_counts_post_delete')
+
+
+def store_rendered_html(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'text' in update_fields:
+        store_html([instance.text])
+
+
+for model in (Post, Comment):
+    post_save.connect(store_rendered_html, sender=model,
+                      dispatch_uid=f'blog_html_{model.__name__}_save')
+
+
+def schedule_visibility(sender, instance, created, **kwargs):
+    """Ставит пересчёт видимости отложенного поста на дату публикации."""
+    # В eager-режиме задача выполнилась бы сразу, а не в срок: отложенные
+    # посты открывает периодический blog_sync_visibility.
+    if settings.TASKS_EAGER:
+        return
+    previous = getattr(instance, '_previous_schedule', None)
+    if not created and previous in (
+            None, (instance.pub_date, instance.is_published)):
+        return
+    delay = (instance.pub_date - timezone.now()).total_seconds()
+    if instance.is_published and delay > 0:
+        refresh_visibility.delay_for(delay, [instance.pk])
+
+
+def remember_category_published(sender, instance, **kwargs):
+    instance._was_published = None
+    if instance.pk is not None:
+        instance._was_published = Category.objects.filter(
+            pk=instance.pk).values_list('is_published', flat=True).first()
+
+
+def propagate_category_published(sender, instance, created, using,
+                                 **kwargs):
+    """Пересчитывает видимость постов категории в фоне, пачками."""
+    was_published = getattr(instance, '_was_published', None)
+    if not created and was_published is not None and (
+            was_published != instance.is_published):
+        schedule_propagation([instance.pk], using)
+
+
+def sync_orphan_posts(sender, instance, **kwargs):
+    # Посты удалённой категории остались без неё и скрываются.
+    Post.objects.filter(category=None).sync_visibility()
+
+
+post_save.connect(schedule_visibility, sender=Post,
+                  dispatch_uid='blog_visibility_post_save')
+pre_save.connect(remember_category_published, sender=Category,
+                 dispatch_uid='blog_visibility_category_pre_save')
+post_save.connect(propagate_category_published, sender=Category,
+                  dispatch_uid='blog_visibility_category_save')
+post_delete.connect(sync_orphan_posts, sender=Category,
+                    dispatch_uid='blog_visibility_category_delete')
+
+
+def invalidate_detail_of_post(sender, instance, **kwargs):
+    invalidate_post_detail(instance.pk)
+    invalidate_feeds()
+
+
+def invalidate_detail_of_comment(sender, instance, **kwargs):
+    invalidate_post_detail(instance.post_id)
+    # В карточках лент выводится число комментариев.
+    invalidate_feeds()
+
+
+post_save.connect(invalidate_detail_of_post, sender=Post,
+                  dispatch_uid='blog_hot_post_save')
+post_delete.connect(invalidate_detail_of_post, sender=Post,
+                    dispatch_uid='blog_hot_post_delete')
+post_save.connect(invalidate_detail_of_comment, sender=Comment,
+                  dispatch_uid='blog_hot_comment_save')
+post_delete.connect(invalidate_detail_of_comment, sender=Comment,
+                    dispatch_uid='blog_hot_comment_delete')
+
+
+def remember_author_names(sender, instance, **kwargs):
+    instance._previous_names = None
+    if instance.pk is not None:
+        instance._previous_names = sender.objects.filter(
+            pk=instance.pk).values_list(
+                'username', 'first_name', 'last_name').first()
+
+
+def invalidate_detail_of_author(sender, instance, created, **kwargs):
+    """Сбрасывает страницы постов и ленты, где выведено старое имя."""
+    previous = getattr(instance, '_previous_names', None)
+    names = (instance.username, instance.first_name, instance.last_name)
+    if created or previous is None or previous == names:
+        return
+    post_ids = Post.objects.filter(author=instance).order_by().values_list(
+        'pk', flat=True).union(Comment.objects.filter(
+            author=instance).order_by().values_list('post_id', flat=True))
+    for post_id in post_ids:
+        invalidate_post_detail(post_id)
+    invalidate_feeds()
+
+
+pre_save.connect(remember_author_names, sender=get_user_model(),
+                 dispatch_uid='blog_hot_user_pre_save')
+post_save.connect(invalidate_detail_of_author, sender=get_user_model(),
+                  dispatch_uid='blog_hot_user_save')
@@ -0,0 +1,151 @@
+"""Генерация реалистичного синтетического набора данных для нагрузки.
+
+* даты публикации смещены к настоящему (экспоненциальное распределение),
+  часть постов отложена в будущее, часть снята с публикации;
+* авторы и комментарии распределены по закону Ципфа: немногие посты и
+  пользователи собирают большую часть активности;
+* часть категорий и местоположений не опубликована.
+
+Строки пишутся через ``blog.bulk_load.load_rows``, минуя ORM-объекты.
+"""
+import itertools
+import random
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db.models import Max
+from django.utils import timezone
+
+from .bulk_load import load_rows
+from .models import Category, Comment, Location, Post, make_preview
+
+WORDS = (
+    'утро день вечер город дорога лес море кофе книга поезд друг кот '
+    'дождь солнце работа отпуск музыка парк письмо окно мост река '
+    'гора снег ветер небо сад чай рынок площадь история вопрос ответ'
+).split()
+SYNTHETIC_PASSWORD = 'synthetic-password'
+
+
+def zipf_weights(count, exponent):
+    """Кумулятивные веса рангов 1..count для random.choices."""
+    return list(itertools.accumulate(
+        1 / rank ** exponent for rank in range(1, count + 1)))
+
+
+def next_pk(model):
+    return (model.objects.aggregate(Max('pk'))['pk__max'] or 0) + 1
+
+
+def sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+class SyntheticDataset:
+    def __init__(self, users=100, posts=1000, comments=10000, categories=10,
+                 locations=20, seed=0, unpublished_ratio=0.05,
+                 future_ratio=0.03, hidden_reference_ratio=0.1,
+                 zipf_exponent=1.1, mean_age_days=60):
+        self.users = users
+        self.posts = posts
+        self.comments = comments
+        self.categories = categories
+        self.locations = locations
+        self.rng = random.Random(seed)
+        self.unpublished_ratio = unpublished_ratio
+        self.future_ratio = future_ratio
+        self.hidden_reference_ratio = hidden_reference_ratio
+        self.zipf_exponent = zipf_exponent
+        self.mean_age_days = mean_age_days
+        self.now = timezone.now()
+
+    def timestamp(self, moment):
+        return moment.isoformat()
+
+    def past_moment(self):
+        age = self.rng.expovariate(1 / self.mean_age_days)
+        return self.now - timedelta(days=age)
+
+    def iter_rows(self):
+        rng = self.rng
+        User = get_user_model()
+        password = make_password(SYNTHETIC_PASSWORD)
+        first_user = next_pk(User)
+        user_ids = range(first_user, first_user + self.users)
+        for pk in user_ids:
+            yield User, pk, {
+                'username': f'user{pk}',
+                'password': password,
+                'email': f'user{pk}@example.com',
+                'is_active': True,
+                'date_joined': self.timestamp(self.past_moment()),
+            }
+
+        reference_ids = {}
+        for model, count in ((Category, self.categories),
+                             (Location, self.locations)):
+            first = next_pk(model)
+            reference_ids[model] = range(first, first + count)
+            for pk in reference_ids[model]:
+                hidden = rng.random() < self.hidden_reference_ratio
+                fields = {
+                    'is_published': not hidden,
+                    'created_at': self.timestamp(self.now),
+                }
+                if model is Category:
+                    fields.update(title=sentence(rng, 2),
+                                  description=sentence(rng, 12),
+                                  slug=f'category-{pk}')
+                else:
+                    fields['name'] = sentence(rng, 2)
+                yield model, pk, fields
+
+        author_weights = zipf_weights(self.users, self.zipf_exponent)
+        first_post = next_pk(Post)
+        post_ids = range(first_post, first_post + self.posts)
+        post_dates = {}
+        for pk in post_ids:
+            if rng.random() < self.future_ratio:
+                pub_date = self.now + timedelta(days=rng.uniform(1, 30))
+            else:
+                pub_date = self.past_moment()
+            post_dates[pk] = pub_date
+            text = '\n'.join(sentence(rng, rng.randint(8, 30))
+                             for _ in range(rng.randint(1, 8)))
+            yield Post, pk, {
+                'title': sentence(rng, rng.randint(2, 6)),
+                'text': text,
+                'preview': make_preview(text),
+                'pub_date': self.timestamp(pub_date),
+                'author': rng.choices(user_ids, cum_weights=author_weights)[0],
+                'category': rng.choice(reference_ids[Category]),
+                'location': (rng.choice(reference_ids[Location])
+                             if rng.random() < 0.7 else None),
+                'is_published': rng.random() >= self.unpublished_ratio,
+                'created_at': self.timestamp(min(pub_date, self.now)),
+                'image': '',
+            }
+
+        # Популярность постов по Ципфу: ранги случайно перемешаны,
+        # чтобы «вирусными» были не только первые посты.
+        popular_posts = list(post_ids)
+        rng.shuffle(popular_posts)
+        post_weights = zipf_weights(self.posts, self.zipf_exponent)
+        first_comment = next_pk(Comment)
+        for pk in range(first_comment, first_comment + self.comments):
+            post_id = rng.choices(popular_posts, cum_weights=post_weights)[0]
+            created_at = max(post_dates[post_id], self.past_moment())
+            yield Comment, pk, {
+                'text': sentence(rng, rng.randint(3, 25)),
+                'post': post_id,
+                'author': rng.choices(user_ids,
+                                      cum_weights=author_weights)[0],
+                'created_at': self.timestamp(min(created_at, self.now)),
+            }
+
+    def generate(self, using='default', progress=None):
+        counts = load_rows(self.iter_rows(), using, progress=progress)
+        # Строки вставлены в обход save(): видимость считаем по базе.
+        Post.objects.using(using).sync_visibility()
+        return counts
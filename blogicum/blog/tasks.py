@@ -0,0 +1,72 @@
+"""Фоновые задачи блога, выполняются обработчиком run_tasks."""
+import io
+import logging
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from tasks.queue import task
+
+from .counts import invalidate_all
+from .models import Post
+from .rendering import store_html
+
+logger = logging.getLogger('blog.tasks')
+
+
+@task
+def delete_files(names):
+    for name in names:
+        try:
+            default_storage.delete(name)
+        except OSError:
+            logger.warning('Не удалось удалить файл %s', name, exc_info=True)
+
+
+@task(max_attempts=3)
+def process_post_image(post_id):
+    """Уменьшает слишком большую картинку поста до POST_IMAGE_MAX_SIZE."""
+    post = Post.objects.filter(pk=post_id).only('image').first()
+    if post is None or not post.image:
+        return
+    limit = settings.POST_IMAGE_MAX_SIZE
+    name = post.image.name
+    with default_storage.open(name) as image_file:
+        image = Image.open(image_file)
+        image.load()
+    if max(image.size) <= limit:
+        return
+    image_format = image.format
+    image.thumbnail((limit, limit))
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format)
+    default_storage.delete(name)
+    new_name = default_storage.save(name, ContentFile(buffer.getvalue()))
+    if new_name != name:
+        Post.objects.filter(pk=post_id).update(image=new_name)
+
+
+@task
+def rerender_html(model_label, pks):
+    """Пересчитывает HTML текста записей текущим рендерером."""
+    model = apps.get_model(model_label)
+    store_html(model.objects.filter(pk__in=pks).values_list(
+        'text', flat=True))
+
+
+@task
+def refresh_visibility(post_ids):
+    """Открывает отложенные посты, чья дата публикации наступила."""
+    if Post.objects.filter(pk__in=post_ids).sync_visibility():
+        invalidate_all()
+
+
+@task(timeout=60 * 60)
+def propagate_visibility(job_id, category_ids, using='default'):
+    """Пересчитывает видимость постов категорий после смены публикации."""
+    from .publishing import propagate
+
+    propagate(job_id, category_ids, using)
@@ -0,0 +1,19 @@
+from django import template
+
+from ..pagecache import HOLES_VARIABLE, placeholder
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, template_name, **params):
+    """Место страницы, зависящее от пользователя (см. blog.pagecache).
+
+    Параметры должны сериализоваться в JSON: в общей части страницы они
+    хранятся в метке.
+    """
+    if context.get(HOLES_VARIABLE):
+        return placeholder(template_name, params)
+    with context.push(params):
+        return context.template.engine.get_template(
+            template_name).render(context)
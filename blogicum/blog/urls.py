@@ -1,13 +1,26 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
 
 app_name = 'blog'
 
+# Под ASGI «читающие» страницы можно обслуживать асинхронными версиями.
+if settings.ASYNC_READ_VIEWS:
+    index_view = async_views.index
+    post_detail_view = async_views.post_detail
+    category_posts_view = async_views.category_posts
+    profile_view = async_views.profile
+else:
+    index_view = views.PostsListView.as_view()
+    post_detail_view = views.PostDetailView.as_view()
+    category_posts_view = views.CategoryListView.as_view()
+    profile_view = views.UserDetailView.as_view()
+
 urlpatterns = [
-    path('', views.PostsListView.as_view(), name='index'),
-    path('posts/<int:post_id>/',
-         views.PostDetailView.as_view(),
-         name='post_detail'),
+    path('', index_view, name='index'),
+    path('posts/<int:post_id>/', post_detail_view, name='post_detail'),
+    path('posts/<int:post_id>/comments/', views.CommentsPageView.as_view(),
+         name='post_comments'),
     path('posts/<int:post_id>/comment/', views.CommentCreateView.as_view(),
          name='add_comment'),
     path('posts/<int:post_id>/edit_comment/<int:comment_id>/',
@@ -16,7 +29,7 @@ urlpatterns = [
     path('posts/<int:post_id>/delete_comment/<int:comment_id>/',
          views.CommentDeleteView.as_view(),
          name='delete_comment'),
-    path('category/<slug:slug>/', views.CategoryListView.as_view(),
+    path('category/<slug:slug>/', category_posts_view,
          name='category_posts'),
     path('posts/create/', views.PostCreateView.as_view(),
          name='create_post'),
@@ -26,7 +39,6 @@ urlpatterns = [
          name='delete_post'),
     path('profile/edit/', views.UserUpdateView.as_view(),
          name='edit_profile'),
-    path('profile/<str:username>/', views.UserDetailView.as_view(),
-         name='profile')
+    path('profile/<str:username>/', profile_view, name='profile')
 
 ]
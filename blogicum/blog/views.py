@@ -1,26 +1,169 @@
-from django.http import Http404
+import logging
+
+from django.http import Http404, HttpResponse, HttpResponseRedirect
 from django.shortcuts import get_object_or_404, redirect
 from django.views.generic import (
     ListView, DetailView, CreateView, DeleteView, UpdateView
 )
-from django.utils import timezone
-from .models import Post, Category, Comment
+from .models import Post, Category, Comment, VersionConflict
 from .forms import PostForm, CommentForm
+from .deletion import delete_post
+from .ingest import comment_buffer
+from .ratelimit import RateLimitMixin
+from .tasks import process_post_image
+from .loaders import get_loaders, load_related
+from .counts import (
+    CountedPaginator, author_scope, category_scope, feed_scope)
+from .paginators import (
+    PageTooDeep, add_page_links, check_page_depth, filter_before, get_before)
+from .hotcache import post_detail_cache
+from . import pagecache
+from .rendering import attach_html
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.core.paginator import Paginator
-from django.db.models import Count
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.conf import settings
+from django.core.exceptions import (
+    NON_FIELD_ERRORS, BadRequest, ValidationError)
+from django.core.signing import BadSignature, Signer
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger('blog.views')
+
+# Порядок вывода комментариев: ключ сортировки и направление сравнения
+# для курсора (keyset-пагинация по паре created_at, id).
+COMMENT_ORDERINGS = {
+    'oldest': (('created_at', 'id'), 'gt'),
+    'newest': (('-created_at', '-id'), 'lt'),
+}
+# Поля автора, которые нужны странице поста и попадают в кеш.
+AUTHOR_FIELDS = ('id', 'username', 'first_name', 'last_name')
 
 
 def get_comment_count_queryset(posts):
-    return posts.annotate(comment_count=Count('comment'))
-
-
-def paginate_posts(posts, request, per_page=10):
-    paginator = Paginator(posts, per_page)
+    # Подзапрос вместо GROUP BY: база идёт по индексу даты и считает
+    # комментарии только у постов страницы, а не у всей ленты.
+    comment_count = Comment.objects.filter(post=OuterRef('pk')).order_by(
+    ).values('post').annotate(count=Count('*')).values('count')
+    return posts.annotate(comment_count=Coalesce(
+        Subquery(comment_count, output_field=IntegerField()), 0))
+
+
+def paginate_posts(posts, request, per_page=10, scope=None):
+    """Страница ленты из постов ``posts`` (без аннотаций и сортировки).
+
+    Число постов для пагинации берётся из счётчика области ``scope``;
+    при навигации по дате оно считается по отфильтрованному набору.
+    """
+    if get_before(request) is not None:
+        posts = filter_before(posts, request)
+        scope = None
+    listing = get_comment_count_queryset(
+        posts.defer('text')).order_by('-pub_date')
+    check_page_depth(listing, request, per_page)
+    paginator = CountedPaginator(listing, per_page, scope=scope,
+                                 count_queryset=posts)
     page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+    return add_page_links(paginator.get_page(page_number), request)
+
+
+class DeepPageRedirectMixin:
+    """Перенаправляет слишком глубокие страницы на навигацию по дате."""
+
+    def get(self, request, *args, **kwargs):
+        try:
+            return super().get(request, *args, **kwargs)
+        except PageTooDeep as error:
+            return redirect(error.url)
+
+
+class CachedPageMixin:
+    """Страница из кеша общей части с дырами под пользователя.
+
+    ``get_page_key`` возвращает ключ страницы или None, если её не надо
+    кешировать; ``get_fragment_context`` — контекст для рендера дыр.
+    """
+
+    def get_page_key(self):
+        return None
+
+    def get_fragment_context(self):
+        return {}
+
+    def get(self, request, *args, **kwargs):
+        key = self.get_page_key()
+        if key is None:
+            return super().get(request, *args, **kwargs)
+        body = pagecache.get_or_render(
+            key, lambda: self.render_shared(*args, **kwargs))
+        return HttpResponse(pagecache.fill_holes(
+            body, request, self.get_fragment_context()))
+
+    def render_shared(self, *args, **kwargs):
+        response = super().get(self.request, *args, **kwargs)
+        return pagecache.render_shared(
+            self.request, response.template_name, response.context_data)
+
+
+def load_post_relations(request, posts):
+    """Подгружает авторов, категории и места для карточек постов."""
+    return load_related(get_loaders(request), list(posts),
+                        'author', 'category', 'location')
+
+
+# Курсор подписан: подделанный или обрезанный отклоняется с 400.
+comment_cursor_signer = Signer(salt='blog.comments.cursor')
+
+
+def encode_comment_cursor(comment):
+    return comment_cursor_signer.sign(
+        f'{comment.id}_{comment.created_at.isoformat()}')
+
+
+def decode_comment_cursor(cursor):
+    try:
+        cursor = comment_cursor_signer.unsign(cursor or '')
+    except BadSignature:
+        return None
+    comment_id, _, created_at = cursor.partition('_')
+    created_at = parse_datetime(created_at) if created_at else None
+    if not comment_id.isdigit() or created_at is None:
+        return None
+    return int(comment_id), created_at
+
+
+def get_comments_page(post, request, per_page=None):
+    """Возвращает порцию комментариев поста и курсор следующей порции."""
+    per_page = per_page or settings.COMMENTS_PER_PAGE
+    order = request.GET.get('order')
+    if order not in COMMENT_ORDERINGS:
+        order = 'oldest'
+    ordering, lookup = COMMENT_ORDERINGS[order]
+    comments = Comment.objects.filter(post=post).order_by(*ordering)
+    after = request.GET.get('after')
+    if after:
+        cursor = decode_comment_cursor(after)
+        if cursor is None:
+            raise BadRequest('Некорректный курсор комментариев.')
+        comment_id, created_at = cursor
+        comments = comments.filter(
+            Q(**{f'created_at__{lookup}': created_at})
+            | Q(created_at=created_at, **{f'id__{lookup}': comment_id})
+        )
+    # Берём на один комментарий больше, чтобы узнать, есть ли продолжение.
+    comments = list(comments[:per_page + 1])
+    next_cursor = None
+    if len(comments) > per_page:
+        comments = comments[:per_page]
+        next_cursor = encode_comment_cursor(comments[-1])
+    return {
+        'comments': comments,
+        'comments_order': order,
+        'comments_next_cursor': next_cursor,
+    }
 
 
 class CommentMixin:
@@ -32,31 +175,81 @@ class CommentMixin:
         return get_object_or_404(Post, id=self.kwargs['post_id'])
 
     def get_success_url(self):
+        # id поста уже есть в адресе, загружать пост ещё раз не нужно.
         return reverse('blog:post_detail',
-                            kwargs={'post_id': self.get_post().id})
+                       kwargs={'post_id': self.kwargs['post_id']})
 
 
 class EditCommentMixin(CommentMixin):
     def get_object(self, queryset=None):
-        comment_id = self.kwargs.get('comment_id')
-        comment = get_object_or_404(Comment, pk=comment_id)
-        if comment.author != self.request.user:
-            raise Http404("Действие запрещено")
-        return comment
+        # Чужой комментарий или комментарий другого поста не найдётся
+        # тем же запросом, без загрузки автора для проверки.
+        return get_object_or_404(
+            Comment,
+            pk=self.kwargs['comment_id'],
+            post_id=self.kwargs['post_id'],
+            author_id=self.request.user.pk,
+        )
 
 
-class PostsListsMixin:
+class VersionedUpdateMixin:
+    """Сохраняет изменённые поля поверх редактируемой версии записи.
+
+    Если запись за это время изменили, отвечает 409 с ошибкой формы.
+    """
+
+    def save_changes(self, form):
+        # Поле обязательное: без версии форма не проходит проверку, иначе
+        # устаревшая форма молча перезаписала бы чужие правки.
+        version = form.cleaned_data['version']
+        self.object = form.save(commit=False)
+        self.object.version = version
+        # Точка сохранения: конфликт не должен испортить внешнюю транзакцию.
+        with transaction.atomic():
+            self.object.save(update_fields=form.changed_data)
+
+    def form_valid(self, form):
+        try:
+            self.save_changes(form)
+        except VersionConflict:
+            form.add_error(None, ValidationError(
+                'Запись уже изменили в другом окне. '
+                'Обновите страницу и повторите правку.', code='conflict'))
+            return self.form_invalid(form)
+        return redirect(self.get_success_url())
+
+    def form_invalid(self, form):
+        response = super().form_invalid(form)
+        # Устаревшая или отсутствующая версия — конфликт правок.
+        if (form.has_error('version')
+                or form.has_error(NON_FIELD_ERRORS, 'conflict')):
+            response.status_code = 409
+        return response
+
+
+class PostsListsMixin(DeepPageRedirectMixin, CachedPageMixin):
     model = Post
     paginate_by = 10
 
+    def get_page_key(self):
+        return pagecache.page_key(self.request, pagecache.feed_versions())
+
     def get_queryset(self):
-        now = timezone.now()
-        posts = Post.objects.filter(
-            pub_date__lte=now,
-            is_published=True,
-            category__is_published=True
-        )
-        return get_comment_count_queryset(posts).order_by('-pub_date')
+        # Аннотацию и сортировку добавляет paginate_posts.
+        return Post.objects.visible()
+
+    def get_count_scope(self):
+        return feed_scope()
+
+    def paginate_queryset(self, queryset, page_size):
+        page = paginate_posts(queryset, self.request, page_size,
+                              self.get_count_scope())
+        return page.paginator, page, page.object_list, page.has_other_pages()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        load_post_relations(self.request, context['page_obj'])
+        return context
 
 
 class CommentListView(ListView):
@@ -65,14 +258,22 @@ class CommentListView(ListView):
     form_class = CommentForm
 
 
-class CommentCreateView(LoginRequiredMixin, CommentMixin, CreateView):
+class CommentCreateView(RateLimitMixin, LoginRequiredMixin, CommentMixin,
+                        CreateView):
+    rate_limit_scope = 'comment'
+
     def form_valid(self, form):
         form.instance.author = self.request.user
         form.instance.post = self.get_post()
+        if settings.COMMENT_BUFFERED:
+            # Комментарий сохранит фоновый поток вместе с соседними.
+            comment_buffer.add(form.instance)
+            return redirect(self.get_success_url())
         return super().form_valid(form)
 
 
-class CommentUpdateView(LoginRequiredMixin, EditCommentMixin, UpdateView):
+class CommentUpdateView(LoginRequiredMixin, EditCommentMixin,
+                        VersionedUpdateMixin, UpdateView):
     pass
 
 
@@ -80,34 +281,34 @@ class CommentDeleteView(LoginRequiredMixin, EditCommentMixin, DeleteView):
     pass
 
 
-class UserDetailView(DetailView):
+class UserDetailView(DeepPageRedirectMixin, DetailView):
     model = get_user_model()
     template_name = 'blog/profile.html'
     context_object_name = 'profile'  # Имя переменной в шаблоне
 
     def get_object(self, queryset=None):
-        return get_object_or_404(get_user_model(),
-                                 username=self.kwargs['username'])
+        profile = get_object_or_404(get_user_model(),
+                                    username=self.kwargs['username'])
+        # Все карточки профиля принадлежат этому автору.
+        get_loaders(self.request).for_model(type(profile)).prime(profile)
+        return profile
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        now = timezone.now()
 
         # Если пользователь просматривает свой профиль
-        if self.request.user == self.object:
+        is_owner = self.request.user == self.object
+        if is_owner:
             # Показываем ВСЕ посты, включая неопубликованные и будущие
             posts = Post.objects.filter(author=self.object)
         else:
-            posts = Post.objects.filter(
-                author=self.object,
-                is_published=True,
-                pub_date__lte=now,
-                category__is_published=True
-            )
+            posts = Post.objects.visible().filter(author=self.object)
 
         # Сортировка и пагинация
-        posts = get_comment_count_queryset(posts).order_by('-pub_date')
-        context['page_obj'] = paginate_posts(posts, self.request)
+        context['page_obj'] = paginate_posts(
+            posts, self.request,
+            scope=author_scope(self.object.pk, include_hidden=is_owner))
+        load_post_relations(self.request, context['page_obj'])
 
         return context
 
@@ -126,14 +327,18 @@ class UserUpdateView(LoginRequiredMixin, UpdateView):
                             kwargs={'username': self.object.username})
 
 
-class PostCreateView(LoginRequiredMixin, CreateView):
+class PostCreateView(RateLimitMixin, LoginRequiredMixin, CreateView):
+    rate_limit_scope = 'post'
     model = Post
     form_class = PostForm
     template_name = 'blog/create.html'
 
     def form_valid(self, form):
         form.instance.author = self.request.user
-        return super().form_valid(form)
+        response = super().form_valid(form)
+        if self.object.image:
+            process_post_image.delay(self.object.pk)
+        return response
 
     def get_success_url(self):
         # Перенаправляем на страницу профиля текущего пользователя
@@ -141,7 +346,7 @@ class PostCreateView(LoginRequiredMixin, CreateView):
             'username': self.request.user.username})
 
 
-class PostUpdateView(LoginRequiredMixin, UpdateView):
+class PostUpdateView(LoginRequiredMixin, VersionedUpdateMixin, UpdateView):
     model = Post
     form_class = PostForm
     template_name = 'blog/create.html'
@@ -153,10 +358,15 @@ class PostUpdateView(LoginRequiredMixin, UpdateView):
         return super().dispatch(request, *args, **kwargs)
 
     def form_valid(self, form):
-        if form.instance.author != self.request.user:
+        if form.instance.author_id != self.request.user.pk:
             return redirect('blog:post_detail', post_id=self.kwargs['post_id'])
         return super().form_valid(form)
 
+    def save_changes(self, form):
+        super().save_changes(form)
+        if 'image' in form.changed_data and self.object.image:
+            process_post_image.delay(self.object.pk)
+
     def get_success_url(self):
         return reverse('blog:profile',
                             kwargs={'username': self.request.user.username})
@@ -169,74 +379,154 @@ class PostDeleteView(LoginRequiredMixin, DeleteView):
     def get_object(self, queryset=None):
         post_id = self.kwargs.get('post_id')
         post = get_object_or_404(Post, pk=post_id)
-        if post.author != self.request.user and not self.request.user.is_staff:
+        if (post.author_id != self.request.user.pk
+                and not self.request.user.is_staff):
             raise Http404("Удаление запрещено")
         return post
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        # Место для карточки берётся из кеша справочников.
+        load_related(get_loaders(self.request), [self.object], 'location')
         # Create a form instance with the post object for the template
-        context['form'] = PostForm(instance=self.get_object())
+        context['form'] = PostForm(instance=self.object)
         return context
 
+    def delete(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        success_url = self.get_success_url()
+        # Комментарии и картинка удаляются пачкой, без сборщика Django.
+        delete_post(self.object)
+        return HttpResponseRedirect(success_url)
+
     def get_success_url(self):
         # Перенаправляем на страницу профиля после успешного редактирования
         return reverse('blog:profile', kwargs={
             'username': self.request.user.username})
 
 
-class PostDetailView(DetailView):
+def is_first_comments_page(request):
+    return (not request.GET.get('after')
+            and request.GET.get('order') in (None, '', 'oldest'))
+
+
+def build_post_detail(post_id, request):
+    """Пост и первая порция комментариев вместе с их авторами."""
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None:
+        return None
+    detail = {'post': post, **get_comments_page(post, request)}
+    # Автор поста и авторы комментариев загружаются одним запросом.
+    load_related(get_loaders(request), [post, *detail['comments']],
+                 'author')
+    strip_authors([post, *detail['comments']])
+    return detail
+
+
+def strip_authors(objects):
+    """Заменяет авторов копиями только с полями ``AUTHOR_FIELDS``.
+
+    Данные страницы поста кешируются целиком: хеш пароля, почта и
+    прочие поля пользователя в кеш попасть не должны.
+    """
+    authors = {}
+    for obj in objects:
+        if obj.author_id not in authors:
+            author = obj.author
+            authors[obj.author_id] = get_user_model().from_db(
+                author._state.db, AUTHOR_FIELDS,
+                [getattr(author, name) for name in AUTHOR_FIELDS])
+        obj.author = authors[obj.author_id]
+
+
+class PostDetailView(CachedPageMixin, DetailView):
     model = Post
     template_name = 'blog/detail.html'  # Укажите ваш шаблон
     context_object_name = 'post'  # Имя переменной в шаблоне
+    cache_level = None
+
+    def get(self, request, *args, **kwargs):
+        response = super().get(request, *args, **kwargs)
+        if self.cache_level is not None:
+            stats = post_detail_cache.stats()
+            logger.debug('Post detail cache %s for %s: %s',
+                         self.cache_level, request.path, stats)
+            if settings.DEBUG:
+                response['X-Post-Cache'] = (
+                    f'{self.cache_level}; '
+                    f'hit_ratio={stats["hit_ratio"]:.2f}')
+        return response
+
+    def get_page_key(self):
+        if not is_first_comments_page(self.request):
+            return None
+        # Версии читаются до данных: страница не окажется старше ключа.
+        versions = pagecache.post_versions(self.kwargs['post_id'])
+        self.object = self.get_object()
+        return pagecache.page_key(self.request, versions)
 
     def get_object(self, queryset=None):
-        # Получаем объект публикации по первичному ключу (pk)
-        post = get_object_or_404(Post, pk=self.kwargs['post_id'])
-
-        # Текущее время
-        now = timezone.now()
-
-        # Проверяем условия:
-        # 1. Дата публикации не позже текущего времени
-        # 2. Публикация опубликована
-        # 3. Категория публикации опубликована
-        if self.request.user != post.author:
-            if (
-                post.pub_date > now
-                or not post.is_published
-                or not post.category.is_published
-            ):
-                raise Http404("Публикация не найдена или недоступна.")
+        if getattr(self, 'object', None) is not None:
+            return self.object
+        post_id = self.kwargs['post_id']
+        if is_first_comments_page(self.request):
+            self.detail, self.cache_level = post_detail_cache.get_or_build(
+                post_id, lambda: build_post_detail(post_id, self.request))
+        else:
+            self.detail = build_post_detail(post_id, self.request)
+        # Автор видит свой пост всегда, остальные — только видимый всем.
+        if self.detail is None or not self.detail['post'].is_visible_to(
+                self.request.user):
+            raise Http404('Публикация не найдена или недоступна.')
+        post = self.detail['post']
+        # Категория и место берутся из кеша справочников без запросов.
+        load_related(get_loaders(self.request), [post],
+                     'category', 'location')
         return post
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['comments'] = self.object.comment_set.all()
+        context.update(
+            (name, value) for name, value in self.detail.items()
+            if name != 'post')
+        attach_html([self.object, *context['comments']])
+        context.update(self.get_fragment_context())
+        return context
+
+    def get_fragment_context(self):
+        context = {'post': self.object}
         if self.request.user.is_authenticated:
             context['form'] = CommentForm()
-
+            context['pending_comments'] = comment_buffer.pending_for(
+                self.object.pk, self.request.user.pk)
+            attach_html(context['pending_comments'])
         return context
 
 
+class CommentsPageView(PostDetailView):
+    """Следующая порция комментариев («Показать ещё») со ссылкой на пост."""
+
+    template_name = 'blog/comments_page.html'
+
+
 class PostsListView(PostsListsMixin, ListView):
     template_name = 'blog/index.html'
 
 
 class CategoryListView(PostsListsMixin, ListView):
     template_name = 'blog/category.html'
-    context_object_name = 'page_obj'
 
     def get_queryset(self):
         category_slug = self.kwargs['slug']
-        category = get_object_or_404(
+        self.category = get_object_or_404(
             Category, slug=category_slug, is_published=True)
-        return get_comment_count_queryset(
-            super().get_queryset().
-            filter(category=category)).order_by('-pub_date')
+        get_loaders(self.request).for_model(Category).prime(self.category)
+        return super().get_queryset().filter(category=self.category)
+
+    def get_count_scope(self):
+        return category_scope(self.category.pk)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['category'] = get_object_or_404(
-            Category, slug=self.kwargs['slug'], is_published=True)
+        context['category'] = self.category
         return context
@@ -0,0 +1,93 @@
+"""Прогрев кешей после выкладки.
+
+После перезапуска все кеши пусты, и первые посетители платят за сборку
+счётчиков, справочников, HTML текстов и данных страниц постов. Здесь
+самые посещаемые страницы запрашиваются заранее тестовым клиентом в
+пуле потоков, а шаблоны компилируются в кеш загрузчика.
+
+Общий кеш Django прогревается для всех процессов, если он общий
+(memcached, redis). Локальный LRU страниц постов и скомпилированные
+шаблоны живут в памяти процесса: для них ``warm`` нужно вызывать в
+самом процессе сервера, например из хука запуска воркера.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count
+from django.template import TemplateSyntaxError, engines
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from .models import Category, Post
+
+
+def get_page_urls(pages=3, posts=20):
+    """Адреса для прогрева: страницы ленты, категории и посты."""
+    urls = [reverse('blog:index')]
+    urls += [f'{reverse("blog:index")}?page={number}'
+             for number in range(2, pages + 1)]
+    urls += [
+        reverse('blog:category_posts', args=[slug])
+        for slug in Category.objects.filter(
+            is_published=True).order_by('pk').values_list('slug', flat=True)
+    ]
+    top_posts = Post.objects.visible().annotate(
+        comment_count=Count('comment')
+    ).order_by('-comment_count', '-pub_date').values_list(
+        'pk', flat=True)[:posts]
+    urls += [reverse('blog:post_detail', args=[pk]) for pk in top_posts]
+    return urls
+
+
+def get_template_names():
+    """Шаблоны из каталогов проекта (без шаблонов приложений)."""
+    names = []
+    for engine in engines.all():
+        for directory in map(Path, engine.dirs):
+            names += [(engine, str(path.relative_to(directory)))
+                      for path in sorted(directory.rglob('*.html'))]
+    return names
+
+
+def warm_url(url):
+    started = time.perf_counter()
+    try:
+        status = Client().get(url).status_code
+    finally:
+        # У каждого потока пула своё соединение с базой.
+        connections.close_all()
+    return {'target': url, 'status': status,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 2)}
+
+
+def warm_template(engine, name):
+    started = time.perf_counter()
+    try:
+        engine.get_template(name)
+        status = 'ok'
+    except TemplateSyntaxError as error:
+        status = f'ошибка: {error}'
+    return {'target': f'template:{name}', 'status': status,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 2)}
+
+
+def warm(pages=3, posts=20, concurrency=4, templates=True):
+    """Прогревает страницы и шаблоны; возвращает список результатов.
+
+    Каждый результат — словарь с ключами target, status, elapsed_ms.
+    Страницы запрашиваются не более чем ``concurrency`` потоками сразу.
+    """
+    results = []
+    if templates:
+        results += [warm_template(engine, name)
+                    for engine, name in get_template_names()]
+    urls = get_page_urls(pages, posts)
+    # Тестовый клиент ходит с заголовком Host: testserver.
+    with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results += executor.map(warm_url, urls)
+    return results
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -33,6 +34,7 @@ ALLOWED_HOSTS = []
 INSTALLED_APPS = [
     'blog.apps.BlogConfig',
     'pages.apps.PagesConfig',
+    'tasks.apps.TasksConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -48,6 +50,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'blog.middleware.IdentityMapMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -149,5 +152,63 @@ LOGIN_REDIRECT_URL = 'blog:index'
 MEDIA_ROOT = BASE_DIR / 'media'
 
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Отправка писем через очередь задач: нужен запущенный обработчик
+# run_tasks, иначе письма останутся в очереди.
+if os.getenv('BLOGICUM_QUEUED_EMAIL', '') == '1':
+    EMAIL_BACKEND = 'tasks.mail.QueuedEmailBackend'
+# Бэкенд, которым обработчик очереди задач на самом деле отправляет письма.
+TASKS_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 # Указываем директорию, в которую будут сохраняться файлы писем:
 EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
+
+# Сколько комментариев выводится на странице поста за один раз;
+# остальные подгружаются по ссылке «Показать ещё».
+COMMENTS_PER_PAGE = 50
+
+# Глубже этой страницы ленты листаются по дате (?before=), а не по номеру.
+MAX_PAGE_DEPTH = 100
+
+# Как часто пересчитывается приблизительное число постов общей ленты.
+FEED_COUNT_TTL = 60
+
+# Сколько постов пересчитывается за одну транзакцию при смене публикации
+# категории.
+PUBLISH_CHUNK_SIZE = 1000
+
+# Кеш собранных данных страницы поста: LRU в памяти процесса
+# (записей, байт, секунд) перед общим кешем (секунд).
+POST_DETAIL_CACHE = {
+    'max_items': 1000,
+    'max_bytes': 32 * 1024 * 1024,
+    'local_ttl': 30,
+    'shared_ttl': 300,
+}
+
+# Сколько секунд хранится общая часть страниц лент и постов
+# (blog.pagecache); правки сбрасывают её раньше через версии.
+PAGE_CACHE_TTL = 300
+
+# Сколько секунд хранится готовый HTML текста постов и комментариев.
+RENDERED_HTML_TTL = 60 * 60 * 24 * 7
+
+# Лимиты создания записей: (размер пачки, за сколько секунд восполняется).
+RATE_LIMITS = {
+    'comment': (10, 60),
+    'post': (5, 60),
+}
+RATE_LIMIT_CACHE = 'default'
+
+# Буферизованная запись комментариев с групповой фиксацией (blog.ingest).
+COMMENT_BUFFERED = os.getenv('BLOGICUM_BUFFERED_COMMENTS', '') == '1'
+COMMENT_BUFFER_INTERVAL = 0.005
+COMMENT_BUFFER_BATCH_SIZE = 500
+
+# Выполнять фоновые задачи сразу, без очереди и обработчика run_tasks.
+# Отложенные посты тогда открывает только blog_sync_visibility по расписанию.
+TASKS_EAGER = os.getenv('BLOGICUM_TASKS_EAGER', '') == '1'
+
+# Картинки постов больше этого размера по длинной стороне уменьшаются.
+POST_IMAGE_MAX_SIZE = 1600
+
+# Асинхронные версии ленты, категории, профиля и страницы поста (для ASGI).
+ASYNC_READ_VIEWS = os.getenv('BLOGICUM_ASYNC_VIEWS', '') == '1'
@@ -0,0 +1,22 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Task
+
+
+@admin.action(description='Повторить выбранные')
+def retry(modeladmin, request, queryset):
+    updated = queryset.order_by().update(
+        status=Task.QUEUED, attempts=0, run_after=timezone.now(),
+        locked_until=None, locked_by='')
+    modeladmin.message_user(request, f'Задач в очереди: {updated}.')
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'max_attempts',
+                    'run_after', 'locked_by', 'created_at')
+    list_filter = ('status', 'name')
+    actions = (retry,)
+    readonly_fields = ('locked_until', 'locked_by', 'last_error',
+                       'created_at')
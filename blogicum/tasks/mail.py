@@ -0,0 +1,35 @@
+from django.core.mail.backends.base import BaseEmailBackend
+
+from .tasks import send_email
+
+
+def serialize_message(message):
+    if message.attachments:
+        raise ValueError('Письма с вложениями нельзя ставить в очередь.')
+    return {
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': list(message.to),
+        'cc': list(message.cc),
+        'bcc': list(message.bcc),
+        'reply_to': list(message.reply_to),
+        'headers': dict(message.extra_headers),
+        'alternatives': [
+            list(item) for item in getattr(message, 'alternatives', ())
+        ],
+    }
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """Ставит письма в очередь задач вместо отправки в запросе.
+
+    Отправляет их ``TASKS_EMAIL_BACKEND`` в обработчике ``run_tasks``;
+    без запущенного обработчика письма не уходят. Включается переменной
+    окружения ``BLOGICUM_QUEUED_EMAIL=1``.
+    """
+
+    def send_messages(self, email_messages):
+        for message in email_messages:
+            send_email.delay(serialize_message(message))
+        return len(email_messages)
@@ -0,0 +1,69 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from tasks.worker import run_worker
+
+
+def stop_on_signals(stop_event):
+    def handler(signum, frame):
+        # Текущая задача доделывается, новая не берётся.
+        stop_event.set()
+
+    signal.signal(signal.SIGINT, handler)
+    signal.signal(signal.SIGTERM, handler)
+
+
+def worker_process(stop_event, poll_interval, burst):
+    stop_on_signals(stop_event)
+    run_worker(stop_event, poll_interval, burst)
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди в нескольких процессах.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('-p', '--processes', type=int, default=1)
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Пауза в секундах, когда очередь пуста.')
+        parser.add_argument('--burst', action='store_true',
+                            help='Завершиться, когда очередь опустеет.')
+
+    def handle(self, *args, **options):
+        stop_event = multiprocessing.Event()
+        if options['processes'] <= 1:
+            stop_on_signals(stop_event)
+            done = run_worker(stop_event, options['poll_interval'],
+                              options['burst'])
+            self.stdout.write(f'Выполнено задач: {done}')
+            return
+        stop_on_signals(stop_event)
+        # Соединения родителя не должны достаться дочерним процессам.
+        connections.close_all()
+        processes = [
+            self.start_process(stop_event, options)
+            for _ in range(options['processes'])
+        ]
+        while processes:
+            for process in list(processes):
+                process.join(timeout=1)
+                if process.is_alive():
+                    continue
+                processes.remove(process)
+                if (process.exitcode and not stop_event.is_set()
+                        and not options['burst']):
+                    self.stderr.write(
+                        f'Обработчик {process.pid} завершился с кодом '
+                        f'{process.exitcode}, перезапускаем.')
+                    processes.append(self.start_process(stop_event, options))
+
+    def start_process(self, stop_event, options):
+        process = multiprocessing.Process(
+            target=worker_process,
+            args=(stop_event, options['poll_interval'], options['burst']),
+            daemon=True,
+        )
+        process.start()
+        return process
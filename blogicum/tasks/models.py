@@ -0,0 +1,62 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField(
+        max_length=200,
+        verbose_name='Задача')
+    payload = models.JSONField(
+        default=dict,
+        verbose_name='Аргументы')
+    status = models.CharField(
+        max_length=16,
+        choices=STATUSES,
+        default=QUEUED,
+        verbose_name='Состояние')
+    attempts = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Попыток')
+    max_attempts = models.PositiveIntegerField(
+        default=5,
+        verbose_name='Максимум попыток')
+    run_after = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Не раньше')
+    locked_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Занята до',
+        help_text='После этого момента задачу может забрать другой '
+        'обработчик.')
+    locked_by = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name='Обработчик')
+    last_error = models.TextField(
+        blank=True,
+        verbose_name='Последняя ошибка')
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Добавлено')
+
+    class Meta:
+        verbose_name = 'задача'
+        verbose_name_plural = 'Задачи'
+        ordering = ('run_after', 'id')
+        indexes = [
+            models.Index(fields=['status', 'run_after'],
+                         name='task_status_run_after_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
@@ -0,0 +1,98 @@
+"""Очередь фоновых задач в базе данных.
+
+Задача — функция, объявленная с декоратором ``@task`` в модуле
+``tasks.py`` любого приложения::
+
+    @task(max_attempts=3)
+    def send_digest(user_id):
+        ...
+
+    send_digest.delay(user.pk)
+
+``delay`` записывает строку ``Task`` в текущей транзакции: если запрос
+откатится, задача не появится. Аргументы должны сериализоваться в JSON.
+Выполняет задачи команда ``run_tasks``; с ``TASKS_EAGER = True`` задача
+выполняется сразу после фиксации транзакции, без очереди.
+"""
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Task
+
+registry = {}
+
+
+class TaskFunction:
+    def __init__(self, func, name, max_attempts, backoff, backoff_max,
+                 timeout):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def __repr__(self):
+        return f'<task {self.name}>'
+
+    def delay(self, *args, **kwargs):
+        return self.delay_for(None, *args, **kwargs)
+
+    def delay_for(self, countdown, *args, **kwargs):
+        """Ставит задачу в очередь не раньше чем через countdown секунд."""
+        if getattr(settings, 'TASKS_EAGER', False):
+            transaction.on_commit(lambda: self.func(*args, **kwargs))
+            return None
+        run_after = timezone.now()
+        if countdown:
+            run_after += timedelta(seconds=countdown)
+        return Task.objects.create(
+            name=self.name,
+            payload={'args': list(args), 'kwargs': kwargs},
+            max_attempts=self.max_attempts,
+            run_after=run_after,
+        )
+
+    def retry_delay(self, attempts):
+        """Экспоненциальная задержка со случайным разбросом."""
+        delay = min(self.backoff * 2 ** (attempts - 1), self.backoff_max)
+        return delay * random.uniform(0.5, 1.5)
+
+
+def task(func=None, *, name=None, max_attempts=5, backoff=10,
+         backoff_max=3600, timeout=300):
+    """Регистрирует функцию как фоновую задачу.
+
+    ``timeout`` — сколько секунд задача считается занятой обработчиком;
+    если он не завершил её за это время (например, упал), задачу заберёт
+    другой обработчик.
+    """
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__qualname__}'
+        task_function = TaskFunction(func, task_name, max_attempts, backoff,
+                                     backoff_max, timeout)
+        registry[task_name] = task_function
+        return task_function
+
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+
+class UnknownTask(Exception):
+    pass
+
+
+def get_task(name):
+    try:
+        return registry[name]
+    except KeyError:
+        raise UnknownTask(f'Задача {name} не зарегистрирована.')
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+
+from .queue import task
+
+
+@task(max_attempts=8, backoff=30)
+def send_email(message):
+    """Отправляет письмо, сохранённое QueuedEmailBackend."""
+    email = EmailMultiAlternatives(
+        subject=message['subject'],
+        body=message['body'],
+        from_email=message['from_email'],
+        to=message['to'],
+        cc=message['cc'],
+        bcc=message['bcc'],
+        reply_to=message['reply_to'],
+        headers=message['headers'],
+        alternatives=[tuple(item) for item in message['alternatives']],
+        connection=get_connection(settings.TASKS_EMAIL_BACKEND),
+    )
+    email.send()
@@ -0,0 +1,134 @@
+"""Обработчик очереди задач.
+
+Задача захватывается условным UPDATE: обработчик выбирает кандидата и
+переводит его в состояние «выполняется», только если строка всё ещё
+свободна. Это работает и на SQLite, где нет ``SELECT ... SKIP LOCKED``.
+Захват действует ``timeout`` секунд (visibility timeout): задачу,
+чей обработчик упал, по истечении этого срока заберёт другой.
+
+Успешно выполненные задачи удаляются. Упавшие возвращаются в очередь
+с экспоненциальной задержкой, а после ``max_attempts`` попыток остаются
+в состоянии «ошибка» для разбора в админке — в том числе брошенные
+обработчиком, у которых попытки кончились.
+"""
+import logging
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.db import close_old_connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Task
+from .queue import UnknownTask, get_task
+
+logger = logging.getLogger('tasks.worker')
+
+# Сколько кандидатов пробовать захватить за один проход.
+CLAIM_CANDIDATES = 10
+
+
+def get_worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def available(now):
+    """Задачи, которые можно взять: ждущие и брошенные обработчиком."""
+    return (
+        Q(status=Task.QUEUED, run_after__lte=now)
+        | Q(status=Task.RUNNING, locked_until__lt=now,
+            attempts__lt=F('max_attempts'))
+    )
+
+
+def fail_abandoned(now):
+    """Брошенные задачи без оставшихся попыток переводит в «ошибку».
+
+    Иначе задача, роняющая сам обработчик, перезапускалась бы вечно.
+    """
+    return Task.objects.filter(
+        status=Task.RUNNING, locked_until__lt=now,
+        attempts__gte=F('max_attempts'),
+    ).update(status=Task.FAILED, locked_by='', locked_until=None,
+             last_error='Обработчик не завершил задачу за отведённое время.')
+
+
+def claim(worker_id, now=None):
+    """Захватывает одну задачу; возвращает её или None."""
+    now = now or timezone.now()
+    fail_abandoned(now)
+    candidates = Task.objects.filter(available(now)).order_by(
+        'run_after', 'id').values_list('pk', 'name')[:CLAIM_CANDIDATES]
+    for pk, name in candidates:
+        try:
+            timeout = get_task(name).timeout
+        except UnknownTask:
+            timeout = 300
+        claimed = Task.objects.filter(available(now), pk=pk).update(
+            status=Task.RUNNING,
+            locked_by=worker_id,
+            locked_until=now + timedelta(seconds=timeout),
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Task.objects.get(pk=pk)
+    return None
+
+
+def execute(task_row):
+    """Выполняет захваченную задачу; возвращает True при успехе."""
+    try:
+        task_function = get_task(task_row.name)
+        payload = task_row.payload
+        task_function(*payload.get('args', ()), **payload.get('kwargs', {}))
+    except Exception:
+        fail(task_row, traceback.format_exc())
+        return False
+    Task.objects.filter(pk=task_row.pk, locked_by=task_row.locked_by).delete()
+    return True
+
+
+def fail(task_row, error):
+    logger.warning('Задача %s упала (попытка %s из %s)', task_row,
+                   task_row.attempts, task_row.max_attempts)
+    updates = {'last_error': error, 'locked_until': None, 'locked_by': ''}
+    if task_row.attempts >= task_row.max_attempts:
+        updates['status'] = Task.FAILED
+    else:
+        try:
+            delay = get_task(task_row.name).retry_delay(task_row.attempts)
+        except UnknownTask:
+            delay = 60
+        updates['status'] = Task.QUEUED
+        updates['run_after'] = timezone.now() + timedelta(seconds=delay)
+    # Если захват истёк и задачу уже взял другой, её состояние не трогаем.
+    Task.objects.filter(pk=task_row.pk, locked_by=task_row.locked_by).update(
+        **updates)
+
+
+def run_worker(stop_event=None, poll_interval=1.0, burst=False,
+               worker_id=None):
+    """Цикл обработчика; с burst=True завершается, когда очередь пуста.
+
+    Возвращает число выполненных задач.
+    """
+    worker_id = worker_id or get_worker_id()
+    done = 0
+    while stop_event is None or not stop_event.is_set():
+        close_old_connections()
+        task_row = claim(worker_id)
+        if task_row is None:
+            if burst:
+                break
+            if stop_event is not None:
+                stop_event.wait(poll_interval)
+            else:
+                time.sleep(poll_interval)
+            continue
+        if execute(task_row):
+            done += 1
+    close_old_connections()
+    return done
@@ -41,6 +41,19 @@ def enable_debug_false():
         yield
 
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Кеш общий для всех тестов: лимиты, версии и данные не должны
+    переходить из теста в тест."""
+    yield
+    from django.core.cache import cache
+
+    from blog.hotcache import post_detail_cache
+
+    cache.clear()
+    post_detail_cache.local.clear()
+
+
 class SafeImportFromContextManager:
     def __init__(
             self,
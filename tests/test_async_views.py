@@ -0,0 +1,46 @@
+from http import HTTPStatus
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser
+from django.http import Http404
+from django.test import RequestFactory
+
+from blog import async_views
+
+
+def _call(view, user, path='/', **kwargs):
+    request = RequestFactory().get(path)
+    request.user = user
+    return async_to_sync(view)(request, **kwargs)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_read_views(post_with_published_location, comment_to_a_post):
+    post = post_with_published_location
+    anonymous = AnonymousUser()
+    responses = [
+        _call(async_views.index, anonymous),
+        _call(async_views.category_posts, anonymous,
+              slug=post.category.slug),
+        _call(async_views.profile, anonymous,
+              username=post.author.username),
+        _call(async_views.post_detail, anonymous, post_id=post.id),
+    ]
+    for response in responses:
+        assert response.status_code == HTTPStatus.OK
+        assert post.title in response.content.decode('utf-8')
+    assert f'name="comment_{comment_to_a_post.id}"' in (
+        responses[-1].content.decode('utf-8'))
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_post_detail_hides_unpublished(post_with_published_location,
+                                            another_user):
+    post = post_with_published_location
+    post.is_published = False
+    post.save()
+    with pytest.raises(Http404):
+        _call(async_views.post_detail, another_user, post_id=post.id)
+    response = _call(async_views.post_detail, post.author, post_id=post.id)
+    assert response.status_code == HTTPStatus.OK
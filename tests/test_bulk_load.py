@@ -0,0 +1,50 @@
+import io
+import json
+
+import pytest
+
+from blog import bulk_load as bulk_load_module
+from blog.bulk_load import bulk_load, iter_dump
+from blog.models import Comment, Post
+
+DUMP = [
+    {'model': 'blog.comment', 'pk': 1, 'fields': {
+        'text': 'Первый', 'post': 7, 'author': 5,
+        'created_at': '2022-12-18T23:03:52.159Z'}},
+    {'model': 'blog.post', 'pk': 7, 'fields': {
+        'title': 'Пост', 'text': 'Текст', 'author': 5, 'category': 3,
+        'location': None, 'is_published': True, 'image': '',
+        'pub_date': '2022-12-18T20:00:00Z',
+        'created_at': '2022-12-18T23:03:52.159Z'}},
+    {'model': 'blog.category', 'pk': 3, 'fields': {
+        'title': 'Категория', 'description': 'Описание', 'slug': 'cat',
+        'is_published': True, 'created_at': '2022-12-18T23:03:52.159Z'}},
+    {'model': 'auth.user', 'pk': 5, 'fields': {
+        'username': 'loader', 'password': '!', 'is_active': True,
+        'date_joined': '2022-12-18T23:03:52.159Z', 'groups': [],
+        'user_permissions': []}},
+]
+
+
+@pytest.mark.parametrize('as_lines', [False, True])
+def test_iter_dump_streams_small_chunks(monkeypatch, as_lines):
+    monkeypatch.setattr(bulk_load_module, 'CHUNK_SIZE', 7)
+    if as_lines:
+        text = '\n'.join(json.dumps(obj) for obj in DUMP)
+    else:
+        text = json.dumps(DUMP, ensure_ascii=False, indent=2)
+    assert list(iter_dump(io.StringIO(text))) == DUMP
+
+
+@pytest.mark.django_db
+def test_bulk_load_resolves_foreign_keys():
+    counts = bulk_load(io.StringIO(json.dumps(DUMP)), batch_size=2)
+    assert counts['blog.Comment'] == 1
+    post = Post.objects.select_related('author', 'category').get(pk=7)
+    assert post.author.username == 'loader'
+    assert post.category.slug == 'cat'
+    # auto_now_add не перезаписывает дату из дампа.
+    assert post.created_at.year == 2022
+    # Отрывок считается при загрузке, как в Post.save().
+    assert post.preview['excerpt'] == 'Текст'
+    assert Comment.objects.get(pk=1).post_id == 7
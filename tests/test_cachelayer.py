@@ -0,0 +1,60 @@
+import threading
+import time
+
+from django.core.cache import cache
+
+from blog import cachelayer
+
+
+def test_concurrent_misses_compute_once():
+    cache.delete('test:stampede')
+    calls = []
+    barrier = threading.Barrier(16)
+    results = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.05)
+        return 42
+
+    def read():
+        barrier.wait()
+        results.append(cachelayer.get_or_set('test:stampede', compute, 60))
+
+    threads = [threading.Thread(target=read) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert results == [42] * 16
+
+
+def test_stale_value_is_served_while_refreshing():
+    cache.set('test:stale', ('old', 0.01, time.time() - 1), 60)
+    refreshed = threading.Event()
+
+    def compute():
+        refreshed.set()
+        return 'new'
+
+    assert cachelayer.get_or_set(
+        'test:stale', compute, 60, stale_ttl=30) == 'old'
+    # Второй читатель не запускает ещё одно обновление.
+    assert cachelayer.get_or_set(
+        'test:stale', lambda: 'other', 60, stale_ttl=30) in ('old', 'new')
+    assert refreshed.wait(1)
+    deadline = time.monotonic() + 1
+    while cache.get('test:stale')[0] != 'new':
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert cachelayer.get_or_set('test:stale', compute, 60) == 'new'
+
+
+def test_entry_is_refreshed_early_before_expiry(monkeypatch):
+    cache.set('test:early', ('old', 5.0, time.time() + 1), 60)
+    assert cachelayer.get_or_set('test:early', lambda: 'new', 60) == 'old'
+    # Редкое событие: очередной читатель обновляет запись заранее.
+    monkeypatch.setattr('blog.cachelayer.random.random', lambda: 1e-9)
+    assert cachelayer.get_or_set(
+        'test:early', lambda: 'new', 60, background=False) == 'new'
@@ -0,0 +1,77 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from blog.models import Comment
+from blog.views import decode_comment_cursor, encode_comment_cursor
+
+
+@pytest.fixture
+def post(mixer, published_category):
+    return mixer.blend('blog.Post', category=published_category,
+                       is_published=True, pub_date=timezone.now())
+
+
+@pytest.fixture
+def comments(mixer, post, settings):
+    settings.COMMENTS_PER_PAGE = 2
+    start = timezone.now() - timedelta(hours=1)
+    comments = mixer.cycle(5).blend('blog.Comment', post=post)
+    for minutes, comment in enumerate(comments):
+        comment.created_at = start + timedelta(minutes=minutes)
+    Comment.objects.bulk_update(comments, ['created_at'])
+    return comments
+
+
+def ids(response):
+    return [comment.pk for comment in response.context['comments']]
+
+
+def test_cursor_round_trip_and_tampering():
+    comment = Comment(id=7, created_at=timezone.now())
+    cursor = encode_comment_cursor(comment)
+    assert decode_comment_cursor(cursor) == (7, comment.created_at)
+    assert decode_comment_cursor(cursor.replace('7_', '8_', 1)) is None
+    assert decode_comment_cursor('7_2022-01-01T00:00:00') is None
+    assert decode_comment_cursor('') is None
+
+
+@pytest.mark.django_db
+def test_detail_shows_first_portion_oldest_first(client, post, comments):
+    response = client.get(f'/posts/{post.pk}/')
+    assert ids(response) == [comment.pk for comment in comments[:2]]
+    assert response.context['comments_next_cursor']
+    assert f'/posts/{post.pk}/comments/?order=oldest&after=' in (
+        response.content.decode())
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('order', ['oldest', 'newest'])
+def test_comments_endpoint_follows_cursor(client, post, comments, order):
+    expected = [comment.pk for comment in comments]
+    if order == 'newest':
+        expected.reverse()
+    url = f'/posts/{post.pk}/comments/'
+    seen = []
+    params = {'order': order}
+    while True:
+        response = client.get(url, params)
+        assert response.status_code == 200
+        seen += ids(response)
+        cursor = response.context['comments_next_cursor']
+        if cursor is None:
+            break
+        params['after'] = cursor
+    assert seen == expected
+    assert f'href="/posts/{post.pk}/"' in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_invalid_cursor_is_rejected(client, post, comments):
+    cursor = encode_comment_cursor(comments[0])
+    for after in ('garbage', cursor[:-1], cursor.replace(
+            f'{comments[0].pk}_', f'{comments[3].pk}_', 1)):
+        response = client.get(f'/posts/{post.pk}/comments/',
+                              {'after': after})
+        assert response.status_code == 400
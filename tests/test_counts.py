@@ -0,0 +1,59 @@
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from blog.counts import category_scope, get_count
+from blog.models import Post
+from blog.pagecache import invalidate_feeds
+
+
+def count_queries(context):
+    return [query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT COUNT(*)')]
+
+
+@pytest.mark.django_db
+def test_category_count_is_cached_and_reset_on_write(
+        client, mixer, published_category
+):
+    mixer.cycle(3).blend('blog.Post', category=published_category,
+                         is_published=True, pub_date=timezone.now())
+    url = f'/category/{published_category.slug}/'
+    client.get(url)
+    # Страница собирается заново, а число берётся из кеша.
+    invalidate_feeds()
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert not count_queries(context)
+    assert response.context['page_obj'].paginator.count == 3
+
+    mixer.blend('blog.Post', category=published_category,
+                is_published=True, pub_date=timezone.now())
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    (count_sql,) = count_queries(context)
+    # Считаются посты без соединения с комментариями и группировки.
+    assert 'GROUP BY' not in count_sql
+    assert response.context['page_obj'].paginator.count == 4
+
+
+@pytest.mark.django_db
+def test_count_expires_when_scheduled_post_becomes_visible(
+        mixer, published_category
+):
+    now = timezone.now()
+    scheduled = now + timedelta(minutes=5)
+    mixer.blend('blog.Post', category=published_category,
+                is_published=True, pub_date=now - timedelta(days=1))
+    mixer.blend('blog.Post', category=published_category,
+                is_published=True, pub_date=scheduled)
+    scope = category_scope(published_category.pk)
+    visible = Post.objects.filter(category=published_category,
+                                  pub_date__lte=now)
+    assert get_count(scope, visible) == 1
+    count, valid_until = cache.get(scope.cache_key())
+    assert valid_until == scheduled.timestamp()
@@ -0,0 +1,60 @@
+import pytest
+from django.contrib.admin.models import ADDITION, LogEntry
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db.models.deletion import Collector
+
+from blog.deletion import delete_posts, delete_user
+from blog.models import Comment, Post
+
+
+@pytest.mark.django_db
+def test_delete_user_removes_posts_and_comments_in_chunks(
+        mixer, user, another_user, published_category
+):
+    posts = mixer.cycle(5).blend(
+        'blog.Post', author=user, category=published_category)
+    for post in posts:
+        mixer.cycle(3).blend('blog.Comment', post=post, author=another_user)
+    other_post = mixer.blend(
+        'blog.Post', author=another_user, category=published_category)
+    mixer.cycle(2).blend('blog.Comment', post=other_post, author=user)
+    kept = mixer.blend('blog.Comment', post=other_post, author=another_user)
+    reported = []
+
+    counts = delete_user(user, chunk_size=2,
+                         progress=lambda *args: reported.append(args))
+
+    assert counts == {'comment': 17, 'post': 5, 'user': 1}
+    assert not get_user_model().objects.filter(pk=user.pk).exists()
+    assert list(Post.objects.all()) == [other_post]
+    assert list(Comment.objects.all()) == [kept]
+    assert reported[-1] == ('post', 5)
+
+
+@pytest.mark.django_db
+def test_delete_posts_skips_collector(
+        mixer, user, published_category, django_assert_max_num_queries
+):
+    post = mixer.blend('blog.Post', author=user, category=published_category)
+    mixer.cycle(20).blend('blog.Comment', post=post, author=user)
+    # Пачка pk, картинки, DELETE комментариев и постов, пустая пачка,
+    # задача удаления файла и точки сохранения транзакции.
+    with django_assert_max_num_queries(8):
+        counts = delete_posts(Post.objects.filter(pk=post.pk))
+    assert counts == {'comment': 20, 'post': 1}
+
+
+@pytest.mark.django_db
+def test_delete_user_row_skips_collector(mixer, user, monkeypatch):
+    group = Group.objects.create(name='Авторы')
+    user.groups.add(group)
+    LogEntry.objects.log_action(user.pk, None, None, 'запись', ADDITION)
+
+    def collect(*args, **kwargs):
+        raise AssertionError('Сборщик Django не должен вызываться.')
+
+    monkeypatch.setattr(Collector, 'collect', collect)
+    assert delete_user(user) == {'comment': 0, 'post': 0, 'user': 1}
+    assert not LogEntry.objects.exists()
+    assert Group.objects.get().user_set.count() == 0
@@ -0,0 +1,46 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.template.defaultfilters import truncatewords
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from blog.models import Post
+
+TEXT = ' '.join(f'слово{number}' for number in range(30))
+
+
+@pytest.mark.django_db
+def test_excerpt_is_saved_and_updated_with_text(mixer):
+    post = mixer.blend('blog.Post', text=TEXT)
+    assert post.preview['excerpt'] == truncatewords(TEXT, 10)
+    assert post.preview['word_count'] == 30
+
+    post.text = 'Короткий текст'
+    post.save(update_fields=['text'])
+    post.refresh_from_db()
+    assert post.preview['excerpt'] == 'Короткий текст'
+    assert post.preview['word_count'] == 2
+
+
+@pytest.mark.django_db
+def test_feed_does_not_load_post_text(client, mixer, published_category):
+    mixer.blend('blog.Post', text=TEXT, category=published_category,
+                is_published=True, pub_date=timezone.now())
+    with CaptureQueriesContext(connection) as context:
+        response = client.get('/')
+    assert truncatewords(TEXT, 10) in response.content.decode()
+    listing_sql = [query['sql'] for query in context.captured_queries
+                   if 'comment_count' in query['sql']]
+    assert listing_sql
+    assert all('"blog_post"."text"' not in sql for sql in listing_sql)
+
+
+@pytest.mark.django_db
+def test_backfill_fills_missing_excerpts(mixer):
+    post = mixer.blend('blog.Post', text=TEXT)
+    Post.objects.filter(pk=post.pk).update(preview={})
+    call_command('blog_backfill_excerpts', verbosity=0)
+    post.refresh_from_db()
+    assert post.preview['excerpt'] == truncatewords(TEXT, 10)
+    assert post.preview['word_count'] == 30
@@ -0,0 +1,42 @@
+import csv
+import json
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from blog.export import export_corpus
+
+
+@pytest.mark.django_db
+def test_export_resumes_from_checkpoint(tmp_path, mixer, published_category):
+    posts = mixer.cycle(5).blend('blog.Post', category=published_category)
+    export_corpus(tmp_path, ['post'], chunk_size=2)
+    lines = (tmp_path / 'post.jsonl').read_text().splitlines()
+    assert [json.loads(line)['id'] for line in lines] == [
+        post.id for post in posts]
+
+    new_post = mixer.blend('blog.Post', category=published_category)
+    result = export_corpus(tmp_path, ['post'], chunk_size=2, resume=True)
+    assert result == {'post': 1}
+    lines = (tmp_path / 'post.jsonl').read_text().splitlines()
+    assert json.loads(lines[-1])['id'] == new_post.id
+    assert len(lines) == 6
+
+
+@pytest.mark.django_db
+def test_export_filters_by_category(tmp_path, mixer, published_category,
+                                    another_category):
+    mixer.cycle(2).blend('blog.Post', category=published_category)
+    other = mixer.blend('blog.Post', category=another_category)
+    export_corpus(tmp_path, ['post'], file_format='csv',
+                  category=another_category.slug)
+    with open(tmp_path / 'post.csv', newline='') as csv_file:
+        rows = list(csv.reader(csv_file))
+    assert len(rows) == 2
+    assert rows[1][0] == str(other.id)
+
+
+@pytest.mark.parametrize('since', ['вчера', '2020-02-30'])
+def test_export_rejects_bad_since_date(tmp_path, since):
+    with pytest.raises(CommandError, match='Не удалось разобрать дату'):
+        call_command('blog_export', str(tmp_path), '--since', since)
@@ -0,0 +1,91 @@
+import pickle
+
+import pytest
+from django.utils import timezone
+
+from blog.counts import invalidate_all
+from blog.hotcache import LRUCache, post_detail_cache
+from blog.models import Post
+
+
+def test_lru_limits_items_bytes_and_age(monkeypatch):
+    lru = LRUCache(max_items=2, max_bytes=1000, ttl=10)
+    lru.set('a', 1, b'x' * 100)
+    lru.set('b', 1, b'x' * 100)
+    assert lru.get('a', 1) is not None
+    lru.set('c', 1, b'x' * 100)
+    # Вытеснена давно не использованная запись.
+    assert lru.get('b', 1) is None
+    assert lru.get('a', 1) is not None and lru.evictions == 1
+
+    lru.set('big', 1, b'x' * 700)
+    assert len(lru.entries) == 1 and lru.size <= 1000
+    assert lru.get('big', 2) is None
+
+    lru.set('d', 1, b'x')
+    monkeypatch.setattr('blog.hotcache.time.monotonic', lambda: 1e12)
+    assert lru.get('d', 1) is None
+    assert lru.size == 0
+
+
+@pytest.fixture
+def post(mixer, published_category):
+    return mixer.blend('blog.Post', category=published_category,
+                       is_published=True, pub_date=timezone.now())
+
+
+@pytest.mark.django_db
+def test_new_comment_invalidates_cached_detail(client, mixer, post):
+    assert client.get(f'/posts/{post.pk}/').status_code == 200
+    before = post_detail_cache.stats()
+    client.get(f'/posts/{post.pk}/')
+    assert post_detail_cache.stats()['local_hits'] == (
+        before['local_hits'] + 1)
+
+    mixer.blend('blog.Comment', post=post, text='Свежий комментарий')
+    assert 'Свежий комментарий' in client.get(
+        f'/posts/{post.pk}/').content.decode()
+
+
+@pytest.mark.django_db
+def test_local_copy_is_checked_against_shared_version(client, post):
+    client.get(f'/posts/{post.pk}/')
+    # Другой процесс сменил версию: локальная копия больше не годится.
+    post_detail_cache.invalidate(post.pk)
+    before = post_detail_cache.stats()['misses']
+    client.get(f'/posts/{post.pk}/')
+    assert post_detail_cache.stats()['misses'] == before + 1
+
+
+@pytest.mark.django_db
+def test_bulk_unpublish_hides_cached_post(client, post):
+    client.get(f'/posts/{post.pk}/')
+    Post.objects.filter(pk=post.pk).update(is_published=False,
+                                           is_visible=False)
+    invalidate_all()
+    assert client.get(f'/posts/{post.pk}/').status_code == 404
+
+
+@pytest.mark.django_db
+def test_cached_detail_keeps_only_public_author_fields(client, mixer, post):
+    mixer.blend('blog.Comment', post=post, author=post.author)
+    client.get(f'/posts/{post.pk}/')
+    blob = post_detail_cache.local.get(
+        post.pk, post_detail_cache.get_version(post.pk))
+    detail = pickle.loads(blob)
+    for author in (detail['post'].author, detail['comments'][0].author):
+        assert author.username == post.author.username
+        assert {'password', 'email', 'last_login'}.isdisjoint(
+            vars(author))
+    assert post.author.password.encode() not in blob
+
+
+@pytest.mark.django_db
+def test_author_rename_invalidates_cached_detail(client, post):
+    client.get(f'/posts/{post.pk}/')
+    client.get('/')
+    post.author.username = 'renamed_author'
+    post.author.save()
+    assert '@renamed_author' in client.get(
+        f'/posts/{post.pk}/').content.decode()
+    assert '@renamed_author' in client.get('/').content.decode()
@@ -0,0 +1,44 @@
+import pytest
+
+from blog.ingest import comment_buffer
+from blog.models import Comment
+
+
+@pytest.mark.django_db
+def test_buffered_comment_is_visible_to_author_before_flush(
+        user_client, client, post_with_published_location, settings,
+        monkeypatch
+):
+    settings.COMMENT_BUFFERED = True
+    # Пишем в потоке теста, а не в фоновом.
+    monkeypatch.setattr(comment_buffer, 'start', lambda: None)
+    post = post_with_published_location
+    for number in range(3):
+        user_client.post(f'/posts/{post.id}/comment/',
+                         {'text': f'Буферный комментарий {number}'})
+    assert not Comment.objects.exists()
+
+    content = user_client.get(f'/posts/{post.id}/').content.decode()
+    assert 'Буферный комментарий 2' in content
+    assert 'Буферный комментарий' not in client.get(
+        f'/posts/{post.id}/').content.decode()
+
+    assert comment_buffer.flush() == 3
+    assert Comment.objects.filter(post=post).count() == 3
+    assert not comment_buffer.pending
+
+
+# Внешние ключи SQLite проверяются при фиксации, а не в точке сохранения.
+@pytest.mark.django_db(transaction=True)
+def test_buffer_drops_only_broken_comments(
+        user, post_with_published_location, monkeypatch
+):
+    monkeypatch.setattr(comment_buffer, 'start', lambda: None)
+    good = Comment(text='ok', post=post_with_published_location,
+                   author=user)
+    broken = Comment(text='lost', post_id=10 ** 6, author=user)
+    comment_buffer.add(good)
+    comment_buffer.add(broken)
+    assert comment_buffer.flush() == 1
+    assert list(Comment.objects.values_list('text', flat=True)) == ['ok']
+    assert not comment_buffer.pending
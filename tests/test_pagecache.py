@@ -0,0 +1,51 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from blog import pagecache
+
+
+@pytest.fixture
+def post(mixer, published_category, user):
+    return mixer.blend('blog.Post', category=published_category,
+                       is_published=True, pub_date=timezone.now(),
+                       author=user)
+
+
+def blog_queries(context):
+    return [query['sql'] for query in context.captured_queries
+            if 'blog_' in query['sql']]
+
+
+@pytest.mark.django_db
+def test_shared_page_is_filled_per_user(
+        post, mixer, user, user_client, another_user_client, client,
+        monkeypatch
+):
+    comment = mixer.blend('blog.Comment', post=post, author=user)
+    url = f'/posts/{post.pk}/'
+    edit_url = f'/posts/{post.pk}/edit_comment/{comment.pk}/'
+    assert 'Войти' in client.get(url).content.decode()
+
+    renders = []
+    monkeypatch.setattr(pagecache, 'render_shared',
+                        lambda *args: renders.append(args) or '')
+    with CaptureQueriesContext(connection) as context:
+        content = user_client.get(url).content.decode()
+    assert not blog_queries(context)
+    assert user.username in content and 'Войти' not in content
+    assert 'csrfmiddlewaretoken' in content and edit_url in content
+    assert f'/posts/{post.pk}/edit/' in content
+
+    content = another_user_client.get(url).content.decode()
+    assert 'csrfmiddlewaretoken' in content
+    assert edit_url not in content and f'/posts/{post.pk}/edit/' not in content
+    assert not renders
+
+
+@pytest.mark.django_db
+def test_feed_page_follows_new_comments(post, mixer, user_client):
+    user_client.get('/')
+    mixer.blend('blog.Comment', post=post)
+    assert 'Комментарии (1)' in user_client.get('/').content.decode()
@@ -0,0 +1,72 @@
+from datetime import timedelta
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from blog.models import Post
+from blog.paginators import EstimatedCountPaginator
+
+
+@pytest.fixture
+def many_posts(user, published_category):
+    now = timezone.now()
+    return Post.objects.bulk_create(
+        Post(title=f'Пост {number}', text='Текст', author=user,
+             category=published_category,
+             pub_date=now - timedelta(hours=number))
+        for number in range(1, 301)
+    )
+
+
+@pytest.mark.django_db
+def test_page_links_are_elided(client, many_posts):
+    response = client.get('/?page=15')
+    links = response.context['page_obj'].page_links
+    assert links[:2] == [1, '…']
+    assert 13 in links and 17 in links
+    assert links[-1] == 30
+    assert len(links) <= 10
+    assert response.content.decode().count('class="page-link"') < 20
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url', ['/', '/category/{slug}/'])
+def test_deep_page_redirects_to_date_navigation(
+        client, many_posts, published_category, settings, url
+):
+    settings.MAX_PAGE_DEPTH = 5
+    url = url.format(slug=published_category.slug)
+    response = client.get(f'{url}?page=20')
+    assert response.status_code == 302
+    query = parse_qs(urlparse(response['Location']).query)
+    assert 'page' not in query
+    # Граница — последний пост пятой страницы.
+    assert parse_datetime(query['before'][0]) == many_posts[49].pub_date
+
+    response = client.get(response['Location'])
+    page_obj = response.context['page_obj']
+    assert list(page_obj.object_list)[0].title == many_posts[50].title
+    assert max(n for n in page_obj.page_links if n != '…') <= 5
+    assert not page_obj.show_last
+    assert 'Ранее' in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_impossible_before_date_is_bad_request(client):
+    assert client.get('/?before=2020-02-30T00:00').status_code == 400
+
+
+@pytest.mark.django_db
+def test_admin_paginator_counts_exactly_without_estimate(
+        mixer, published_category
+):
+    posts = mixer.cycle(3).blend('blog.Post', category=published_category)
+    Post.objects.filter(pk=posts[1].pk).delete()
+    Post.objects.bulk_create([Post(
+        pk=posts[-1].pk + 20000, title='Далёкий', text='Текст',
+        author=posts[0].author, category=published_category,
+        pub_date=timezone.now())])
+    # Разброс pk — 20000, но строк всего три.
+    assert EstimatedCountPaginator(Post.objects.order_by('pk'), 50).count == 3
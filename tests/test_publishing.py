@@ -0,0 +1,60 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from blog import publishing
+from blog.models import Category, Post
+from tasks.worker import run_worker
+
+
+@pytest.fixture
+def category_posts(mixer, published_category):
+    return mixer.cycle(5).blend(
+        'blog.Post', category=published_category, is_published=True,
+        pub_date=timezone.now() - timedelta(hours=1))
+
+
+@pytest.mark.django_db
+def test_admin_unpublish_propagates_in_batches(
+        admin_client, published_category, category_posts, settings
+):
+    settings.PUBLISH_CHUNK_SIZE = 2
+    response = admin_client.post('/admin/blog/category/', {
+        'action': 'unpublish',
+        '_selected_action': [published_category.pk],
+    })
+    assert response.status_code == 302
+    published_category.refresh_from_db()
+    assert not published_category.is_published
+    # Посты ещё не пересчитаны, но уже скрыты из лент.
+    assert Post.objects.filter(is_visible=True).count() == 5
+    assert not Post.objects.visible().exists()
+    (entry,) = publishing.get_category_progress(
+        [published_category.pk]).values()
+    assert entry['done'] == 0 and entry['total'] == 5
+
+    run_worker(burst=True)
+    assert not Post.objects.filter(is_visible=True).exists()
+    assert not publishing.get_category_progress([published_category.pk])
+
+
+@pytest.mark.django_db
+def test_command_publishes_and_reports_progress(
+        capsys, published_category, category_posts
+):
+    Category.objects.filter(pk=published_category.pk).update(
+        is_published=False)
+    Post.objects.update(is_visible=False)
+    call_command('blog_set_published', 'category',
+                 str(published_category.pk), '--wait')
+    output = capsys.readouterr().out
+    assert 'Постов: 5 из 5' in output
+    assert Post.objects.filter(is_visible=True).count() == 5
+
+
+@pytest.mark.django_db
+def test_unchanged_category_schedules_nothing(published_category):
+    assert publishing.set_published(
+        Category, [published_category.pk], True) == (0, None)
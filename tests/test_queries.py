@@ -0,0 +1,172 @@
+import pytest
+from django.db import connection
+from django.db.models import Model
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from mixer.backend.django import Mixer
+
+from blog.hotcache import post_detail_cache
+from conftest import N_PER_PAGE
+
+
+@pytest.mark.django_db
+def test_post_detail_batches_authors(
+        mixer: Mixer, client, post_with_published_location: Model,
+        django_assert_num_queries
+):
+    post = post_with_published_location
+    mixer.cycle(5).blend('blog.Comment', post=post)
+    # Первый запрос заполняет кеш справочников.
+    client.get(f'/posts/{post.id}/')
+    post_detail_cache.invalidate(post.id)
+    # Пост, комментарии, все авторы одним запросом; категория и место
+    # берутся из кеша справочников.
+    with django_assert_num_queries(3):
+        client.get(f'/posts/{post.id}/')
+    # Дальше страница собирается из кеша страницы поста.
+    with django_assert_num_queries(0):
+        client.get(f'/posts/{post.id}/')
+
+
+@pytest.mark.django_db
+def test_index_does_not_query_per_card(
+        mixer: Mixer, client, published_category, published_location,
+        django_assert_max_num_queries
+):
+    mixer.cycle(N_PER_PAGE).blend(
+        'blog.Post', category=published_category,
+        location=published_location, is_published=True,
+        pub_date=timezone.now())
+    # COUNT, страница постов и по запросу на авторов, категории и места.
+    with django_assert_max_num_queries(5):
+        client.get('/')
+
+
+@pytest.mark.django_db
+def test_identity_map_shares_category(
+        mixer: Mixer, client, published_category, published_location,
+        settings
+):
+    settings.DEBUG = True
+    mixer.cycle(N_PER_PAGE).blend(
+        'blog.Post', category=published_category,
+        location=published_location, is_published=True,
+        pub_date=timezone.now())
+    response = client.get(f'/category/{published_category.slug}/')
+    assert 'Category hits=' in response['X-Identity-Map']
+    category_stats = [
+        item for item in response['X-Identity-Map'].split('; ')
+        if item.startswith('Category')
+    ][0]
+    assert 'misses=0' in category_stats
+
+
+@pytest.fixture
+def admin_client(client, user):
+    user.is_staff = user.is_superuser = True
+    user.save()
+    client.force_login(user)
+    return client
+
+
+@pytest.mark.django_db
+def test_admin_post_changelist_does_not_query_per_row(
+        mixer: Mixer, admin_client, published_category, published_location,
+        django_assert_max_num_queries
+):
+    mixer.cycle(N_PER_PAGE).blend(
+        'blog.Post', category=published_category,
+        location=published_location, pub_date=timezone.now())
+    # Сессия, пользователь, COUNT, страница, фильтр категорий и
+    # date_hierarchy; строки идут одним запросом с JOIN.
+    with django_assert_max_num_queries(8):
+        response = admin_client.get('/admin/blog/post/')
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_admin_publish_action_is_single_update(
+        mixer: Mixer, admin_client, published_category
+):
+    posts = mixer.cycle(3).blend(
+        'blog.Post', category=published_category, is_published=True,
+        pub_date=timezone.now())
+    data = {
+        'action': 'unpublish',
+        '_selected_action': [post.id for post in posts],
+        'index': 0,
+    }
+    with CaptureQueriesContext(connection) as context:
+        admin_client.post('/admin/blog/post/', data)
+    updates = [query['sql'] for query in context.captured_queries
+               if query['sql'].startswith('UPDATE "blog_post"')]
+    assert len(updates) == 1
+    for post in posts:
+        post.refresh_from_db()
+        assert not post.is_published
+
+
+@pytest.fixture
+def own_comment(mixer, user, post_with_published_location):
+    return mixer.blend('blog.Comment', post=post_with_published_location,
+                       author=user)
+
+
+# Сессия и пользователь запроса — два запроса в каждом случае ниже;
+# правка выполняется в точке сохранения (SAVEPOINT и RELEASE).
+@pytest.mark.django_db
+@pytest.mark.parametrize('method, action, data, expected', [
+    ('get', 'edit_comment', {}, 3),
+    ('post', 'edit_comment', {'text': 'Новый текст'}, 6),
+    ('get', 'delete_comment', {}, 3),
+    ('post', 'delete_comment', {}, 4),
+])
+def test_comment_mutations_use_single_scoped_query(
+        user_client, own_comment, method, action, data, expected,
+        django_assert_num_queries
+):
+    url = f'/posts/{own_comment.post_id}/{action}/{own_comment.id}/'
+    if data:
+        data = {**data, 'version': own_comment.version}
+    with django_assert_num_queries(expected):
+        response = getattr(user_client, method)(url, data)
+    assert response.status_code in (200, 302)
+
+
+@pytest.mark.django_db
+def test_comment_of_other_post_is_not_found(
+        user_client, own_comment, mixer, published_category
+):
+    other_post = mixer.blend('blog.Post', category=published_category)
+    response = user_client.get(
+        f'/posts/{other_post.id}/edit_comment/{own_comment.id}/')
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_add_comment_loads_post_once(
+        user_client, post_with_published_location, django_assert_num_queries
+):
+    post = post_with_published_location
+    # Сессия, пользователь, пост и INSERT.
+    with django_assert_num_queries(4):
+        user_client.post(f'/posts/{post.id}/comment/', {'text': 'Текст'})
+
+
+@pytest.mark.django_db
+def test_delete_post_queries(
+        user_client, user, post_with_published_location, mixer,
+        django_assert_num_queries
+):
+    post = post_with_published_location
+    post.author = user
+    post.save()
+    mixer.cycle(3).blend('blog.Comment', post=post)
+    user_client.get(f'/posts/{post.id}/delete/')
+    # Сессия, пользователь, пост; место из кеша справочников.
+    with django_assert_num_queries(3):
+        user_client.get(f'/posts/{post.id}/delete/')
+    # Сессия, пользователь, пост, два DELETE и задача удаления картинки
+    # в точке сохранения.
+    with django_assert_num_queries(8):
+        user_client.post(f'/posts/{post.id}/delete/')
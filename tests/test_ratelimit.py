@@ -0,0 +1,48 @@
+import pytest
+from django.core.cache import cache
+
+from blog.models import Comment
+from blog.ratelimit import LocalStore, RateLimiter, TokenBucket
+
+
+def test_token_bucket_refills_over_time():
+    bucket = TokenBucket(capacity=2, period=10)
+    allowed, state, _ = bucket.take(None, now=0)
+    allowed, state, _ = bucket.take(state, now=0)
+    assert allowed
+    allowed, state, retry_after = bucket.take(state, now=1)
+    assert not allowed
+    assert retry_after == pytest.approx(4)
+    allowed, state, _ = bucket.take(state, now=5)
+    assert allowed
+
+
+class BrokenCaches:
+    def __getitem__(self, alias):
+        raise ConnectionError('cache is down')
+
+
+def test_limiter_falls_back_to_memory(monkeypatch):
+    monkeypatch.setattr('blog.ratelimit.caches', BrokenCaches())
+    monkeypatch.setattr('blog.ratelimit.local_store', LocalStore())
+    limiter = RateLimiter('test', capacity=1, period=60)
+    assert limiter.hit('user:1', now=0) == (True, 0)
+    assert not limiter.hit('user:1', now=1)[0]
+
+
+@pytest.mark.django_db
+def test_comment_burst_gets_429(
+        user_client, post_with_published_location, settings,
+        django_assert_num_queries
+):
+    cache.clear()
+    settings.RATE_LIMITS = {'comment': (2, 60)}
+    url = f'/posts/{post_with_published_location.id}/comment/'
+    for _ in range(2):
+        user_client.post(url, {'text': 'Спам'})
+    # Сессия и пользователь; форма и пост не загружаются.
+    with django_assert_num_queries(2):
+        response = user_client.post(url, {'text': 'Спам'})
+    assert response.status_code == 429
+    assert int(response['Retry-After']) == 30
+    assert Comment.objects.count() == 2
@@ -0,0 +1,45 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from blog.pagecache import invalidate_feeds
+
+
+def reference_queries(context):
+    return [query['sql'] for query in context.captured_queries
+            if 'FROM "blog_category"' in query['sql']
+            or 'FROM "blog_location"' in query['sql']]
+
+
+def get_feed(client):
+    # Страница ленты собирается заново, справочники — из кеша.
+    invalidate_feeds()
+    with CaptureQueriesContext(connection) as context:
+        content = client.get('/').content.decode()
+    return content, reference_queries(context)
+
+
+@pytest.mark.django_db
+def test_feed_reloads_references_only_after_change(
+        client, mixer, published_category, published_location
+):
+    mixer.blend('blog.Post', category=published_category,
+                location=published_location, is_published=True,
+                pub_date=timezone.now())
+    client.get('/')
+    content, queries = get_feed(client)
+    assert published_location.name in content
+    assert not queries
+
+    published_location.name = 'Новое место'
+    published_location.save()
+    content, queries = get_feed(client)
+    assert 'Новое место' in content
+    assert len(queries) == 2
+    assert not get_feed(client)[1]
+
+    published_category.delete()
+    content, queries = get_feed(client)
+    assert 'Новое место' not in content
+    assert queries
@@ -0,0 +1,56 @@
+import pytest
+from django.utils import timezone
+
+from blog import rendering
+from tasks.models import Task
+from tasks.worker import run_worker
+
+TEXT = 'Первая строка <b>\nВторая строка'
+HTML = 'Первая строка &lt;b&gt;<br>Вторая строка'
+
+
+@pytest.fixture
+def post(mixer, published_category):
+    return mixer.blend('blog.Post', text=TEXT, category=published_category,
+                       is_published=True, pub_date=timezone.now())
+
+
+@pytest.mark.django_db
+def test_detail_renders_text_once(client, mixer, post, monkeypatch):
+    mixer.blend('blog.Comment', post=post, text='Комментарий\nв две строки')
+    client.get(f'/posts/{post.pk}/')
+
+    def fail(text):
+        raise AssertionError('HTML должен браться из кеша.')
+
+    monkeypatch.setattr(rendering, 'render_text', fail)
+    content = client.get(f'/posts/{post.pk}/').content.decode()
+    assert HTML in content
+    assert 'Комментарий<br>в две строки' in content
+
+
+@pytest.mark.django_db
+def test_edited_text_is_rendered_again(client, post):
+    client.get(f'/posts/{post.pk}/')
+    post.text = 'Новый\nтекст'
+    post.save()
+    content = client.get(f'/posts/{post.pk}/').content.decode()
+    assert 'Новый<br>текст' in content
+    assert HTML not in content
+
+
+@pytest.mark.django_db
+def test_renderer_change_rerenders_in_background(client, post, monkeypatch):
+    client.get(f'/posts/{post.pk}/')
+    monkeypatch.setattr(rendering, 'RENDERER_VERSION',
+                        rendering.RENDERER_VERSION + 1)
+
+    # Пока пересчёт в очереди, показывается прежний HTML.
+    for _ in range(2):
+        assert HTML in client.get(f'/posts/{post.pk}/').content.decode()
+    assert Task.objects.filter(name='blog.tasks.rerender_html').count() == 1
+
+    run_worker(burst=True)
+    version, html = rendering.cache.get(rendering.html_key(TEXT))
+    assert version == rendering.RENDERER_VERSION
+    assert html == HTML
@@ -0,0 +1,20 @@
+import pytest
+from django.contrib.auth import get_user_model
+
+from blog.loadtest import iter_url_cases
+from blog.models import Comment, Post
+from blog.synthetic import SyntheticDataset
+
+
+@pytest.mark.django_db
+def test_synthetic_dataset_and_url_cases():
+    counts = SyntheticDataset(
+        users=5, posts=30, comments=200, categories=2, locations=3,
+        hidden_reference_ratio=0).generate()
+    assert counts['blog.Comment'] == 200
+    assert get_user_model().objects.count() == 5
+    assert Comment.objects.filter(post__in=Post.objects.all()).count() == 200
+
+    names = {name for name, _, _ in iter_url_cases()}
+    assert {'blog:index', 'blog:post_detail', 'blog:edit_comment',
+            'pages:about', 'pages:rules'} <= names
@@ -0,0 +1,107 @@
+from datetime import timedelta
+
+import pytest
+from django.core import mail
+from django.utils import timezone
+
+from tasks.models import Task
+from tasks.queue import task
+from tasks.worker import claim, execute, run_worker
+
+calls = []
+
+
+@task(max_attempts=2, backoff=10, timeout=60)
+def flaky(value):
+    calls.append(value)
+    if len(calls) == 1:
+        raise RuntimeError('first attempt fails')
+
+
+@pytest.mark.django_db
+def test_failed_task_is_retried_with_backoff_then_succeeds():
+    calls.clear()
+    flaky.delay('x')
+    task_row = claim('worker-1')
+    assert not execute(task_row)
+    task_row.refresh_from_db()
+    assert task_row.status == Task.QUEUED
+    assert task_row.attempts == 1
+    assert 'first attempt fails' in task_row.last_error
+    assert task_row.run_after > timezone.now() + timedelta(seconds=4)
+    # Раньше задержки задачу не берут.
+    assert claim('worker-1') is None
+
+    task_row = claim('worker-1', now=task_row.run_after)
+    assert execute(task_row)
+    assert calls == ['x', 'x']
+    assert not Task.objects.exists()
+
+
+@pytest.mark.django_db
+def test_abandoned_task_is_reclaimed_after_visibility_timeout():
+    flaky.delay('y')
+    now = timezone.now()
+    first = claim('worker-1', now=now)
+    assert claim('worker-2', now=now + timedelta(seconds=30)) is None
+    second = claim('worker-2', now=now + timedelta(seconds=61))
+    assert second.pk == first.pk
+    assert second.locked_by == 'worker-2'
+    assert second.attempts == 2
+
+
+@pytest.mark.django_db
+def test_queued_send_mail_is_delivered_by_worker(settings):
+    settings.EMAIL_BACKEND = 'tasks.mail.QueuedEmailBackend'
+    settings.TASKS_EMAIL_BACKEND = (
+        'django.core.mail.backends.locmem.EmailBackend')
+    assert mail.send_mail('Тема', 'Текст', 'blog@example.com',
+                          ['reader@example.com']) == 1
+    assert not mail.outbox
+    task_row = Task.objects.get(name='tasks.tasks.send_email')
+    assert task_row.payload['args'][0]['to'] == ['reader@example.com']
+
+    assert run_worker(burst=True) == 1
+    assert mail.outbox[0].subject == 'Тема'
+    assert not Task.objects.exists()
+
+
+@pytest.mark.django_db
+def test_password_reset_email_is_sent_by_worker(client, user, settings):
+    settings.EMAIL_BACKEND = 'tasks.mail.QueuedEmailBackend'
+    settings.TASKS_EMAIL_BACKEND = (
+        'django.core.mail.backends.locmem.EmailBackend')
+    user.email = 'reader@example.com'
+    user.save()
+    client.post('/auth/password_reset/', {'email': user.email})
+    assert not mail.outbox
+    assert Task.objects.filter(name='tasks.tasks.send_email').count() == 1
+
+    assert run_worker(burst=True) == 1
+    assert mail.outbox[0].to == [user.email]
+
+
+@pytest.mark.django_db
+def test_abandoned_task_without_attempts_left_fails():
+    flaky.delay('z')
+    now = timezone.now()
+    claim('worker-1', now=now)
+    claim('worker-2', now=now + timedelta(seconds=61))
+    # Обе попытки роняли обработчик: третьей не будет.
+    assert claim('worker-3', now=now + timedelta(seconds=200)) is None
+    task_row = Task.objects.get()
+    assert task_row.status == Task.FAILED
+    assert task_row.locked_by == ''
+
+
+@pytest.mark.django_db
+def test_expired_worker_does_not_overwrite_new_claim():
+    calls.clear()
+    flaky.delay('w')
+    now = timezone.now()
+    stale = claim('worker-1', now=now)
+    claim('worker-2', now=now + timedelta(seconds=61))
+    assert not execute(stale)
+    task_row = Task.objects.get()
+    assert task_row.status == Task.RUNNING
+    assert task_row.locked_by == 'worker-2'
@@ -0,0 +1,79 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from blog.models import Comment, VersionConflict
+
+
+@pytest.fixture
+def own_comment(mixer, user, post_with_published_location):
+    return mixer.blend('blog.Comment', post=post_with_published_location,
+                       author=user, text='Исходный текст')
+
+
+@pytest.mark.django_db
+def test_stale_comment_edit_gets_conflict(user_client, own_comment):
+    url = (f'/posts/{own_comment.post_id}/edit_comment/'
+           f'{own_comment.id}/')
+    version = own_comment.version
+    response = user_client.post(url, {'text': 'Первая правка',
+                                      'version': version})
+    assert response.status_code == 302
+    response = user_client.post(url, {'text': 'Вторая правка',
+                                      'version': version})
+    assert response.status_code == 409
+    own_comment.refresh_from_db()
+    assert own_comment.text == 'Первая правка'
+    assert own_comment.version == version + 1
+
+
+@pytest.mark.django_db
+def test_update_writes_only_changed_fields(user, own_comment):
+    stale = Comment.objects.get(pk=own_comment.pk)
+    own_comment.text = 'Новый текст'
+    with CaptureQueriesContext(connection) as context:
+        own_comment.save(update_fields=['text'])
+    (update,) = context.captured_queries
+    assert '"created_at"' not in update['sql']
+    assert '"version" = 1' in update['sql']
+
+    stale.text = 'Устаревшая правка'
+    with pytest.raises(VersionConflict):
+        stale.save()
+
+
+@pytest.mark.django_db
+def test_post_edit_updates_changed_fields(
+        user_client, user, post_with_published_location
+):
+    post = post_with_published_location
+    post.author = user
+    post.save()
+    response = user_client.get(f'/posts/{post.id}/edit/')
+    data = {
+        name: value for name, value in response.context['form'].initial.items()
+        if value is not None
+    }
+    data.update(is_published=False, version=post.version,
+                pub_date=post.pub_date.strftime('%Y-%m-%dT%H:%M'),
+                location=post.location_id, category=post.category_id)
+    data.pop('image', None)
+    with CaptureQueriesContext(connection) as context:
+        user_client.post(f'/posts/{post.id}/edit/', data)
+    updates = [query['sql'] for query in context.captured_queries
+               if query['sql'].startswith('UPDATE "blog_post"')]
+    assert len(updates) == 1
+    assert '"text"' not in updates[0]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('data', [{}, {'version': ''}, {'version': 'x'}])
+def test_edit_without_valid_version_is_a_conflict(
+        user_client, own_comment, data
+):
+    url = (f'/posts/{own_comment.post_id}/edit_comment/'
+           f'{own_comment.id}/')
+    response = user_client.post(url, {'text': 'Правка', **data})
+    assert response.status_code == 409
+    own_comment.refresh_from_db()
+    assert own_comment.text == 'Исходный текст'
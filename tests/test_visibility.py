@@ -0,0 +1,122 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from blog.models import Post
+from tasks.models import Task
+from tasks.worker import run_worker
+
+
+@pytest.fixture
+def post(mixer, published_category):
+    return mixer.blend('blog.Post', category=published_category,
+                       is_published=True,
+                       pub_date=timezone.now() - timedelta(hours=1))
+
+
+@pytest.mark.django_db
+def test_visibility_follows_post_and_category(post, published_category):
+    assert post.is_visible
+    assert list(Post.objects.visible()) == [post]
+
+    post.is_published = False
+    post.save(update_fields=['is_published'])
+    post.refresh_from_db()
+    assert not post.is_visible
+
+    post.is_published = True
+    post.save()
+    published_category.is_published = False
+    published_category.save()
+    # Посты категории пересчитываются в фоне, но из лент пропадают сразу.
+    assert not Post.objects.visible().exists()
+    run_worker(burst=True)
+    post.refresh_from_db()
+    assert not post.is_visible
+
+    published_category.is_published = True
+    published_category.save()
+    run_worker(burst=True)
+    post.refresh_from_db()
+    assert post.is_visible
+
+
+@pytest.mark.django_db
+def test_feed_does_not_join_categories(client, post):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get('/')
+    assert list(response.context['page_obj']) == [post]
+    listing_sql = [query['sql'] for query in context.captured_queries
+                   if 'comment_count' in query['sql']]
+    assert listing_sql
+    assert all('blog_category' not in sql for sql in listing_sql)
+
+
+@pytest.mark.django_db
+def test_scheduled_post_becomes_visible_at_pub_date(
+        mixer, published_category
+):
+    pub_date = timezone.now() + timedelta(hours=1)
+    post = mixer.blend('blog.Post', category=published_category,
+                       is_published=True, pub_date=pub_date)
+    assert not post.is_visible
+    task = Task.objects.get(name='blog.tasks.refresh_visibility')
+    assert task.run_after >= pub_date - timedelta(seconds=1)
+
+    Post.objects.filter(pk=post.pk).update(
+        pub_date=timezone.now() - timedelta(seconds=1))
+    Task.objects.update(run_after=timezone.now())
+    run_worker(burst=True)
+    post.refresh_from_db()
+    assert post.is_visible
+
+
+@pytest.mark.django_db
+def test_scheduled_post_is_queued_only_when_schedule_changes(
+        mixer, published_category
+):
+    post = mixer.blend('blog.Post', category=published_category,
+                       is_published=True,
+                       pub_date=timezone.now() + timedelta(hours=1))
+    post.title = 'Правка текста'
+    post.save()
+    post.save(update_fields=['title'])
+    tasks = Task.objects.filter(name='blog.tasks.refresh_visibility')
+    assert tasks.count() == 1
+
+    post.pub_date += timedelta(hours=1)
+    post.save()
+    assert tasks.count() == 2
+
+
+@pytest.mark.django_db
+def test_eager_mode_does_not_queue_scheduled_post(
+        mixer, published_category, settings
+):
+    settings.TASKS_EAGER = True
+    mixer.blend('blog.Post', category=published_category,
+                is_published=True,
+                pub_date=timezone.now() + timedelta(hours=1))
+    assert not Task.objects.exists()
+
+
+@pytest.mark.django_db
+def test_sweeper_fixes_rows_written_around_save(post):
+    Post.objects.filter(pk=post.pk).update(is_published=False)
+    call_command('blog_sync_visibility', verbosity=0)
+    post.refresh_from_db()
+    assert not post.is_visible
+
+
+@pytest.mark.django_db
+def test_author_sees_own_hidden_post(user_client, user, mixer,
+                                     published_category, client):
+    post = mixer.blend('blog.Post', author=user, is_published=False,
+                       category=published_category,
+                       pub_date=timezone.now())
+    assert user_client.get(f'/posts/{post.pk}/').status_code == 200
+    assert client.get(f'/posts/{post.pk}/').status_code == 404
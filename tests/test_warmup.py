@@ -0,0 +1,23 @@
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from blog.hotcache import post_detail_cache
+
+
+@pytest.mark.django_db(transaction=True)
+def test_warm_cache_renders_pages_and_fills_detail_cache(
+        mixer, published_category, client, capsys
+):
+    post = mixer.blend('blog.Post', category=published_category,
+                       is_published=True, pub_date=timezone.now())
+    call_command('blog_warm_cache', pages=2, posts=5, concurrency=2)
+    output = capsys.readouterr()
+    assert output.err == ''
+    assert f'/posts/{post.pk}/: 200' in output.out
+    assert f'/category/{published_category.slug}/: 200' in output.out
+    assert 'template:blog/detail.html: ok' in output.out
+
+    before = post_detail_cache.stats()
+    client.get(f'/posts/{post.pk}/')
+    assert post_detail_cache.stats()['misses'] == before['misses']